@@ -0,0 +1,85 @@
+from os.path import join
+import json, os, pygame
+
+#Run from the project folder: python Code/bake_atlas.py
+#Packs every animation frame, already scaled to the size the game uses, into one raw RGBA atlas
+#and writes an index so the game can memory-map the atlas and cut subsurfaces out of it.
+ATLAS_FOLDER = join('Assets', 'atlas')
+ATLAS_IMAGE = join(ATLAS_FOLDER, 'atlas.rgba')
+ATLAS_INDEX = join(ATLAS_FOLDER, 'atlas.json')
+ATLAS_WIDTH = 1024
+
+def get_animations():
+    """Return a list of (paths, size) for every animation the game uses"""
+    animations = []
+
+    #Player run/idle/jump/attack
+    for folder, name in (('run', 'Run'), ('idle', 'Idle'), ('jump', 'Jump'), ('attack', 'Attack')):
+        paths = [join('Assets', 'images', 'player', folder, f'{name} ({i}).png') for i in range(1, 11)]
+        animations.append((paths, (64, 64)))
+    animations.append(([join('Assets', 'images', 'player', 'slash.png')], (32, 32)))
+
+    #Zombie boy/girl walk/dead
+    for gender in ('boy', 'girl'):
+        for folder, name in (('walk', 'Walk'), ('dead', 'Dead')):
+            paths = [join('Assets', 'images', 'zombie', gender, folder, f'{name} ({i}).png') for i in range(1, 11)]
+            animations.append((paths, (64, 64)))
+
+    #Ruby
+    animations.append(([join('Assets', 'images', 'ruby', f'tile{i:03}.png') for i in range(7)], (64, 64)))
+
+    #Green/Purple portals
+    for color in ('green', 'purple'):
+        animations.append(([join('Assets', 'images', 'portals', color, f'tile{i:03}.png') for i in range(22)], (72, 72)))
+
+    #Tiles
+    animations.append(([join('Assets', 'images', 'tiles', f'Tile ({i}).png') for i in range(1, 6)], (32, 32)))
+
+    return animations
+
+def pack(frames, width):
+    """Place the frames on shelves left to right, tallest first. Returns (rects, height)"""
+    rects = {}
+    x = 0
+    y = 0
+    shelf_height = 0
+    for key, (frame_width, frame_height) in sorted(frames.items(), key=lambda item: -item[1][1]):
+        #Start a new shelf if this frame does not fit on the current one
+        if x + frame_width > width:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        rects[key] = (x, y, frame_width, frame_height)
+        x += frame_width
+        shelf_height = max(shelf_height, frame_height)
+
+    return rects, y + shelf_height
+
+def bake():
+    """Bake the atlas image and index"""
+    #Collect every unique (path, size) frame
+    frames = {}
+    for paths, size in get_animations():
+        for path in paths:
+            frames[(path, size)] = size
+
+    rects, height = pack(frames, ATLAS_WIDTH)
+
+    #Blit each pre-scaled frame into the atlas
+    atlas = pygame.Surface((ATLAS_WIDTH, height), pygame.SRCALPHA, 32)
+    index = {"width": ATLAS_WIDTH, "height": height, "frames": []}
+    for (path, size), rect in rects.items():
+        atlas.blit(pygame.transform.scale(pygame.image.load(path), size), rect[:2])
+        #Store paths with forward slashes so the index works on every OS
+        index["frames"].append({"path": path.replace(os.sep, '/'), "size": list(size), "rect": list(rect)})
+
+    os.makedirs(ATLAS_FOLDER, exist_ok=True)
+    with open(ATLAS_IMAGE, 'wb') as atlas_file:
+        atlas_file.write(pygame.image.tobytes(atlas, 'RGBA'))
+    with open(ATLAS_INDEX, 'w') as index_file:
+        json.dump(index, index_file)
+
+    print(f"Baked {len(rects)} frames into a {ATLAS_WIDTH}x{height} atlas")
+
+if __name__ == "__main__":
+    bake()
@@ -0,0 +1,211 @@
+import argparse, itertools, json, os, random, statistics, sys, time
+from concurrent.futures import ProcessPoolExecutor
+import zombie_knight
+
+#Run from the project folder: python Code/batch_sim.py --games 1000 --output sweep.json
+#Plays many headless games with bot input on every core and writes per-night statistics as one JSON file.
+#Difficulty values can be changed with --set, and a comma separated list of values sweeps them:
+#python Code/batch_sim.py --set ZOMBIE_DAMAGE=10,20,30 --set STARTING_ROUND_TIME=30,45
+GAMES = 200
+MAX_NIGHTS = 10
+MAX_FRAMES = zombie_knight.FPS * 60 * 10
+
+#Values that can be changed with --set and whether they belong to the game or the player
+TUNABLES = {
+    'STARTING_ROUND_TIME': 'game',
+    'STARTING_ZOMBIE_CREATION_TIME': 'game',
+    'ZOMBIE_SPEED_BONUS': 'game',
+    'ZOMBIE_DAMAGE': 'game',
+    'RUBY_HEAL': 'game',
+    'STARTING_HEALTH': 'player',
+}
+
+#What each night row of a game holds
+NIGHT_FIELDS = ('survived', 'score', 'health', 'peak_zombies', 'peak_rubies', 'frames')
+
+def random_bot(rng):
+    """Hold a random direction for half a second at a time, jumping and slashing at random"""
+    def get_inputs(engine):
+        if engine.frame_count % 30 == 0:
+            get_inputs.held = rng.choice((0, zombie_knight.INPUT_LEFT, zombie_knight.INPUT_RIGHT))
+        inputs = get_inputs.held
+        if rng.random() < .05:
+            inputs |= zombie_knight.INPUT_JUMP
+        if rng.random() < .1:
+            inputs |= zombie_knight.INPUT_SLASH
+        return inputs
+
+    get_inputs.held = 0
+    return get_inputs
+
+def patrol_bot(rng):
+    """Walk back and forth every two seconds, slashing every quarter second and jumping every second"""
+    def get_inputs(engine):
+        inputs = zombie_knight.INPUT_RIGHT if engine.frame_count // 120 % 2 == 0 else zombie_knight.INPUT_LEFT
+        if engine.frame_count % 15 == 0:
+            inputs |= zombie_knight.INPUT_SLASH
+        if engine.frame_count % 60 == 0:
+            inputs |= zombie_knight.INPUT_JUMP
+        return inputs
+
+    return get_inputs
+
+def idle_bot(rng):
+    """Stand still (how long a night lasts with nobody playing)"""
+    return lambda engine: 0
+
+BOTS = {'random': random_bot, 'patrol': patrol_bot, 'idle': idle_bot}
+
+def start_worker():
+    """Set up pygame once in each worker process"""
+    zombie_knight.setup(headless=True, audio=False)
+
+def play_game(task):
+    """Play one game until the player dies, max_nights are survived or max_frames pass. Returns its night rows"""
+    seed, overrides, bot, max_nights, max_frames = task
+
+    engine = zombie_knight.Engine(zombie_knight.tile_map, render=False, interactive=False, seed=seed)
+    game = engine.game
+    for name, value in overrides.items():
+        setattr(game if TUNABLES[name] == 'game' else engine.player, name, value)
+    game.round_time = game.STARTING_ROUND_TIME
+    game.zombie_creation_time = game.STARTING_ZOMBIE_CREATION_TIME
+    engine.player.health = engine.player.STARTING_HEALTH
+
+    #The bot gets its own generator so its choices never change the game's random numbers
+    get_inputs = BOTS[bot](random.Random(seed))
+
+    nights = []
+    night_start = 0
+    peak_zombies = 0
+    peak_rubies = 0
+    while engine.frame_count < max_frames and len(nights) < max_nights:
+        #The game resets itself at the start of the step after the player runs out of health
+        if engine.player.health <= 0:
+            nights.append((0, game.score, engine.player.health, peak_zombies, peak_rubies, engine.frame_count - night_start))
+            break
+
+        night = game.round_number
+        engine.update(get_inputs(engine))
+        peak_zombies = max(peak_zombies, len(engine.zombie_group))
+        peak_rubies = max(peak_rubies, len(engine.ruby_group))
+
+        if game.round_number != night:
+            nights.append((1, game.score, engine.player.health, peak_zombies, peak_rubies, engine.frame_count - night_start))
+            night_start = engine.frame_count
+            peak_zombies = 0
+            peak_rubies = 0
+
+    return {"seed": seed, "frames": engine.frame_count, "nights": nights}
+
+def summarize(games, max_nights):
+    """Return survival, score and entity counts for each night over every game"""
+    nights = []
+    for night in range(max_nights):
+        rows = [game["nights"][night] for game in games if len(game["nights"]) > night]
+        if not rows:
+            break
+        survived = [row for row in rows if row[0]]
+        nights.append({
+            "night": night + 1,
+            "reached": len(rows),
+            "survived": len(survived),
+            "survival_rate": len(survived) / len(rows),
+            "mean_score": statistics.fmean(row[1] for row in rows),
+            "mean_health_left": statistics.fmean(row[2] for row in survived) if survived else None,
+            "mean_peak_zombies": statistics.fmean(row[3] for row in rows),
+            "max_peak_zombies": max(row[3] for row in rows),
+            "mean_peak_rubies": statistics.fmean(row[4] for row in rows),
+            "mean_seconds": statistics.fmean(row[5] for row in rows) / zombie_knight.FPS,
+        })
+
+    nights_survived = [sum(row[0] for row in game["nights"]) for game in games]
+    final_scores = [game["nights"][-1][1] if game["nights"] else 0 for game in games]
+    return {
+        "games": len(games),
+        "mean_nights_survived": statistics.fmean(nights_survived),
+        "median_nights_survived": statistics.median(nights_survived),
+        "mean_final_score": statistics.fmean(final_scores),
+        "max_final_score": max(final_scores),
+        "nights": nights,
+    }
+
+def parse_overrides(settings):
+    """Turn ['NAME=1,2', ...] into a list of every combination of values as {name: value} dicts"""
+    names = []
+    values = []
+    for setting in settings:
+        name, _, text = setting.partition('=')
+        if name not in TUNABLES or not text:
+            raise ValueError(f"--set takes NAME=VALUE[,VALUE...] with NAME one of {', '.join(TUNABLES)}")
+        names.append(name)
+        values.append([int(value) for value in text.split(',')])
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+def print_results(results):
+    """Print the survival rate of each night for every set of overrides"""
+    for config in results["configs"]:
+        overrides = ' '.join(f"{name}={value}" for name, value in config["overrides"].items()) or "defaults"
+        summary = config["summary"]
+        print(f"{overrides}: {summary['mean_nights_survived']:.2f} nights, score {summary['mean_final_score']:.0f}")
+        for night in summary["nights"]:
+            print(f"  night {night['night']:>2}{night['reached']:>7} reached{night['survival_rate']:>8.1%} survived"
+                  f"{night['mean_peak_zombies']:>7.1f} zombies{night['mean_peak_rubies']:>6.1f} rubies")
+
+def main():
+    """Run the batch"""
+    parser = argparse.ArgumentParser(description="Play many headless Zombie Knight games in parallel")
+    parser.add_argument('--games', type=int, default=GAMES, help="games per set of overrides")
+    parser.add_argument('--bot', choices=BOTS, default='random', help="how the bot plays")
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE[,VALUE...]', help="change (or sweep) a difficulty value")
+    parser.add_argument('--max-nights', type=int, default=MAX_NIGHTS, help="stop a game after surviving this many nights")
+    parser.add_argument('--max-frames', type=int, default=MAX_FRAMES, help="stop a game after this many steps")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game (game i uses seed + i)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes (defaults to every core)")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    arguments = parser.parse_args()
+
+    try:
+        configs = parse_overrides(arguments.set)
+    except ValueError as error:
+        parser.error(str(error))
+
+    #Every game is its own task; chunks of several keep the workers busy without much overhead
+    tasks = [(arguments.seed + i, overrides, arguments.bot, arguments.max_nights, arguments.max_frames)
+             for overrides in configs for i in range(arguments.games)]
+    chunk_size = max(1, len(tasks) // (arguments.workers * 8))
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(arguments.workers, initializer=start_worker) as executor:
+        games = list(executor.map(play_game, tasks, chunksize=chunk_size))
+    elapsed = time.perf_counter() - start_time
+
+    frames = sum(game["frames"] for game in games)
+    results = {
+        "bot": arguments.bot,
+        "seed": arguments.seed,
+        "max_nights": arguments.max_nights,
+        "max_frames": arguments.max_frames,
+        "workers": arguments.workers,
+        "seconds": elapsed,
+        "frames_per_second": frames / elapsed,
+        "night_fields": NIGHT_FIELDS,
+        "configs": [],
+    }
+    for i, overrides in enumerate(configs):
+        config_games = games[i * arguments.games:(i + 1) * arguments.games]
+        results["configs"].append({
+            "overrides": overrides,
+            "summary": summarize(config_games, arguments.max_nights),
+            #One [seed, nights] row per game, each night a row of NIGHT_FIELDS
+            "games": [[game["seed"], game["nights"]] for game in config_games],
+        })
+
+    print_results(results)
+    print(f"{len(games)} games, {frames} steps in {elapsed:.1f}s on {arguments.workers} workers ({frames / elapsed:.0f} steps/s)", file=sys.stderr)
+    if arguments.output:
+        with open(arguments.output, 'w') as results_file:
+            json.dump(results, results_file, separators=(',', ':'))
+
+if __name__ == "__main__":
+    main()
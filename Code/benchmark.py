@@ -0,0 +1,286 @@
+import argparse, gc, json, platform, subprocess, sys, time, tracemalloc
+from os.path import dirname
+import pygame
+import zombie_knight
+
+#Run from the project folder: python Code/benchmark.py --output results.json
+#Runs each scenario headlessly for a fixed number of frames, times every phase of every frame
+#and writes the results as JSON. Compare two runs with: python Code/benchmark.py --compare old.json new.json
+FRAMES = 600
+WARMUP_FRAMES = 60
+SEED = 0
+
+#Frames traced for allocations (each phase takes a tracemalloc snapshot, so the memory run is much slower than the timing run)
+MEMORY_FRAMES = 60
+
+#Phases timed every frame (a frame is update + draw; kinematics, sprites and collisions are part of update and game_draw is part of draw)
+PHASES = ('frame', 'update', 'kinematics', 'sprites', 'collisions', 'draw', 'game_draw')
+
+def hold_load(engine):
+    """Stop the night from ending, new zombies from spawning and the player from dying so the load stays the same"""
+    engine.game.round_time = 10**9
+    engine.game.zombie_creation_time = 10**9 + 7
+    engine.player.STARTING_HEALTH = 10**9
+    engine.player.health = 10**9
+
+def add_zombies(engine, count):
+    """Add count zombies"""
+    for i in range(count):
+        engine.zombie_group.add(engine.zombie_pool.acquire(engine.game.random, 1, 6))
+
+def add_rubies(engine, count):
+    """Add count rubies"""
+    for i in range(count):
+        engine.ruby_group.add(engine.ruby_pool.acquire(engine.game.random))
+
+def walk(engine):
+    """Walk back and forth every two seconds"""
+    return zombie_knight.INPUT_RIGHT if engine.frame_count // 120 % 2 == 0 else zombie_knight.INPUT_LEFT
+
+def slash(engine):
+    """Walk back and forth, slashing every other frame and jumping every second"""
+    inputs = walk(engine)
+    if engine.frame_count % 2 == 0:
+        inputs |= zombie_knight.INPUT_SLASH
+    if engine.frame_count % 60 == 0:
+        inputs |= zombie_knight.INPUT_JUMP
+    return inputs
+
+def portal_storm(engine):
+    """Drop a handful of zombies and rubies onto the portals every frame"""
+    portals = engine.portal_group.sprites()
+    for i, sprite in enumerate(list(engine.zombie_group)[:20] + list(engine.ruby_group)[:10]):
+        portal = portals[(engine.frame_count + i) % len(portals)]
+        sprite.position = portal.rect.bottomleft
+    return walk(engine)
+
+#name -> (setup(engine), get_inputs(engine))
+SCENARIOS = {
+    'idle': (lambda engine: None, lambda engine: 0),
+    'zombies_50': (lambda engine: add_zombies(engine, 50), walk),
+    'zombies_200': (lambda engine: add_zombies(engine, 200), walk),
+    'zombies_1000': (lambda engine: add_zombies(engine, 1000), walk),
+    'ruby_pileup': (lambda engine: add_rubies(engine, 300), walk),
+    'slashing': (lambda engine: add_zombies(engine, 50), slash),
+    'portal_storm': (lambda engine: (add_zombies(engine, 100), add_rubies(engine, 50)), portal_storm),
+}
+
+class PhaseTimer():
+    """A class to time (and optionally trace the memory of) named phases of a frame"""
+
+    def __init__(self, trace_memory):
+        """Initialize the timer"""
+        self.trace_memory = trace_memory
+        self.times = {phase: [] for phase in PHASES}
+        #Per frame (bytes, blocks) allocated and net bytes kept by each phase
+        self.allocated = {phase: [] for phase in PHASES}
+        self.net_allocated = {phase: [] for phase in PHASES}
+        self.frame_times = {}
+        self.frame_allocated = {}
+        self.frame_net_allocated = {}
+
+    def start_frame(self):
+        """Start timing a new frame"""
+        self.frame_times = dict.fromkeys(PHASES, 0)
+        self.frame_allocated = {phase: (0, 0) for phase in PHASES}
+        self.frame_net_allocated = dict.fromkeys(PHASES, 0)
+
+    def end_frame(self):
+        """Keep the totals of the frame that just ended"""
+        for phase in PHASES:
+            self.times[phase].append(self.frame_times[phase])
+            self.allocated[phase].append(self.frame_allocated[phase])
+            self.net_allocated[phase].append(self.frame_net_allocated[phase])
+
+    def take_snapshot(self):
+        """Return a snapshot of the traced memory (or None when memory isn't traced)"""
+        if self.trace_memory:
+            return tracemalloc.take_snapshot()
+        return None
+
+    def add_memory(self, phase, start_snapshot):
+        """Add what was allocated since start_snapshot to phase. Allocations are summed over the source lines that grew,
+        so memory freed by one line doesn't hide memory allocated by another (the way the net change does)"""
+        if start_snapshot is None:
+            return
+        bytes_allocated, blocks_allocated = self.frame_allocated[phase]
+        for difference in self.take_snapshot().compare_to(start_snapshot, 'lineno'):
+            #Leave out the memory of the snapshots themselves
+            if difference.traceback[0].filename == tracemalloc.__file__:
+                continue
+            bytes_allocated += max(difference.size_diff, 0)
+            blocks_allocated += max(difference.count_diff, 0)
+            self.frame_net_allocated[phase] += difference.size_diff
+        self.frame_allocated[phase] = (bytes_allocated, blocks_allocated)
+
+    def wrap(self, owner, name, phase):
+        """Replace owner.name with a version that adds its time (and memory) to phase"""
+        function = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start_snapshot = self.take_snapshot()
+            start_time = time.perf_counter_ns()
+            result = function(*args, **kwargs)
+            self.frame_times[phase] += time.perf_counter_ns() - start_time
+            self.add_memory(phase, start_snapshot)
+            return result
+
+        setattr(owner, name, timed)
+
+def build_engine(name):
+    """Build an engine running a scenario"""
+    setup_scenario, get_inputs = SCENARIOS[name]
+    engine = zombie_knight.Engine(zombie_knight.tile_map, render=True, interactive=False, seed=SEED)
+    hold_load(engine)
+    setup_scenario(engine)
+    return engine, get_inputs
+
+def instrument(engine, timer):
+    """Time the phases of the engine's frames"""
+    timer.wrap(engine, 'update', 'update')
+    timer.wrap(engine.kinematics, 'update', 'kinematics')
+    for group in (engine.main_tile_group,) + engine.sprite_groups:
+        timer.wrap(group, 'update', 'sprites')
+    timer.wrap(engine.game, 'check_collisions', 'collisions')
+    timer.wrap(engine, 'draw', 'draw')
+    timer.wrap(engine.game, 'draw', 'game_draw')
+
+def run_frames(engine, get_inputs, frames, timer=None):
+    """Step the engine, timing each frame if there is a timer"""
+    for i in range(frames):
+        inputs = get_inputs(engine)
+        if timer:
+            timer.start_frame()
+            start_snapshot = timer.take_snapshot()
+            start_time = time.perf_counter_ns()
+        engine.update(inputs)
+        engine.draw(1)
+        if timer:
+            timer.frame_times['frame'] += time.perf_counter_ns() - start_time
+            timer.add_memory('frame', start_snapshot)
+            timer.end_frame()
+
+def get_percentile(values, percent):
+    """Return the value percent of the way through the sorted values"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+def run_scenario(name, frames):
+    """Run a scenario twice (once timed, once with memory tracing) and return its results"""
+    #Timing run (tracemalloc slows everything down, so it is left off)
+    engine, get_inputs = build_engine(name)
+    run_frames(engine, get_inputs, WARMUP_FRAMES)
+    timer = PhaseTimer(False)
+    instrument(engine, timer)
+    gc.collect()
+    collections = sum(stat['collections'] for stat in gc.get_stats())
+    run_frames(engine, get_inputs, frames, timer)
+    collections = sum(stat['collections'] for stat in gc.get_stats()) - collections
+    sprites = sum(len(group) for group in engine.sprite_groups)
+
+    #Memory run, from the same starting state
+    engine, get_inputs = build_engine(name)
+    run_frames(engine, get_inputs, WARMUP_FRAMES)
+    memory_timer = PhaseTimer(True)
+    instrument(engine, memory_timer)
+    tracemalloc.start()
+    run_frames(engine, get_inputs, min(frames, MEMORY_FRAMES), memory_timer)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    phases = {}
+    for phase in PHASES:
+        times = [time_ns / 1e6 for time_ns in timer.times[phase]]
+        allocated = memory_timer.allocated[phase]
+        net_allocated = memory_timer.net_allocated[phase]
+        phases[phase] = {
+            "mean_ms": sum(times) / len(times),
+            "p50_ms": get_percentile(times, 50),
+            "p99_ms": get_percentile(times, 99),
+            "allocated_bytes_per_frame": sum(bytes_allocated for bytes_allocated, blocks in allocated) / len(allocated),
+            "allocated_blocks_per_frame": sum(blocks for bytes_allocated, blocks in allocated) / len(allocated),
+            "net_allocated_bytes_per_frame": sum(net_allocated) / len(net_allocated),
+        }
+
+    return {
+        "frames": frames,
+        "sprites": sprites,
+        "gc_collections": collections,
+        "peak_traced_bytes": peak_memory,
+        "phases": phases,
+    }
+
+def get_revision():
+    """Return the git revision being benchmarked (or None outside of git)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=dirname(__file__) or '.',
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results):
+    """Print tables of frame time and allocations per phase for each scenario"""
+    print(f"{'scenario':<14}{'sprites':>8}" + ''.join(f"{phase:>12}" for phase in PHASES))
+    for name, scenario in results["scenarios"].items():
+        row = f"{name:<14}{scenario['sprites']:>8}"
+        row += ''.join(f"{scenario['phases'][phase]['mean_ms']:>10.3f}ms" for phase in PHASES)
+        print(row)
+
+    #Blocks and bytes allocated per frame (summed over the source lines that grew), then the net bytes kept per frame
+    print()
+    print(f"{'allocated per frame':<22}" + ''.join(f"{phase:>12}" for phase in PHASES))
+    for name, scenario in results["scenarios"].items():
+        phases = scenario['phases']
+        print(f"{name + ' blocks':<22}" + ''.join(f"{phases[phase]['allocated_blocks_per_frame']:>12.0f}" for phase in PHASES))
+        print(f"{name + ' bytes':<22}" + ''.join(f"{phases[phase]['allocated_bytes_per_frame']:>12.0f}" for phase in PHASES))
+        print(f"{name + ' net bytes':<22}" + ''.join(f"{phases[phase]['net_allocated_bytes_per_frame']:>12.0f}" for phase in PHASES))
+
+def compare(old_path, new_path):
+    """Print how the mean and p99 frame times changed between two result files"""
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old = json.load(old_file)
+        new = json.load(new_file)
+
+    print(f"{old.get('revision')} -> {new.get('revision')} (new time / old time, below 1 is faster)")
+    print(f"{'scenario':<14}{'phase':<12}{'mean':>8}{'p99':>8}")
+    for name, scenario in new["scenarios"].items():
+        if name not in old["scenarios"]:
+            continue
+        for phase, stats in scenario["phases"].items():
+            old_stats = old["scenarios"][name]["phases"].get(phase)
+            if old_stats and old_stats["mean_ms"] > 0 and old_stats["p99_ms"] > 0:
+                print(f"{name:<14}{phase:<12}{stats['mean_ms'] / old_stats['mean_ms']:>8.2f}{stats['p99_ms'] / old_stats['p99_ms']:>8.2f}")
+
+def main():
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark Zombie Knight scenarios")
+    parser.add_argument('--frames', type=int, default=FRAMES, help="timed frames per scenario")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help="comma separated scenario names")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help="compare two result files instead")
+    arguments = parser.parse_args()
+
+    if arguments.compare:
+        compare(*arguments.compare)
+        return
+
+    zombie_knight.setup(headless=True, audio=False)
+
+    results = {
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "seed": SEED,
+        "scenarios": {},
+    }
+    for name in arguments.scenarios.split(','):
+        results["scenarios"][name] = run_scenario(name, arguments.frames)
+        print(f"{name} done", file=sys.stderr)
+
+    print_results(results)
+    if arguments.output:
+        with open(arguments.output, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse, time
+import numpy as np
+import zombie_knight
+
+#Run from the project folder: python Code/vector_env.py --envs 64 --steps 2000
+#Steps many headless games in lockstep for training and testing bots, returning observations as NumPy arrays.
+#Game i of episode n is seeded with seed + i + n * env_count, so every episode of every game plays out differently.
+#
+#    env = VectorEnv(64, seed=0)
+#    observations = env.reset()
+#    observations, rewards, terminated, truncated, info = env.step(actions)  #actions: one index into ACTIONS per game
+
+#The discrete actions (combinations of INPUT_ flags)
+ACTIONS = np.array([
+    0,
+    zombie_knight.INPUT_LEFT,
+    zombie_knight.INPUT_RIGHT,
+    zombie_knight.INPUT_JUMP,
+    zombie_knight.INPUT_SLASH,
+    zombie_knight.INPUT_LEFT | zombie_knight.INPUT_JUMP,
+    zombie_knight.INPUT_RIGHT | zombie_knight.INPUT_JUMP,
+    zombie_knight.INPUT_LEFT | zombie_knight.INPUT_SLASH,
+    zombie_knight.INPUT_RIGHT | zombie_knight.INPUT_SLASH,
+])
+
+#Zombie states in the observations
+ZOMBIE_NONE = 0
+ZOMBIE_WALKING = 1
+ZOMBIE_DEAD = 2
+
+class VectorEnv():
+    """A class to step several headless games in lockstep with discrete actions and NumPy observations"""
+
+    def __init__(self, env_count, seed=0, frame_skip=1, max_episode_steps=None, level_map=zombie_knight.tile_map, max_zombies=64, max_rubies=32):
+        """Initialize the games. Each step repeats the actions for frame_skip frames.
+        Observations only hold the first max_zombies zombies and max_rubies rubies of each game"""
+        zombie_knight.setup(headless=True, audio=False)
+
+        self.env_count = env_count
+        self.frame_skip = frame_skip
+        self.max_episode_steps = max_episode_steps
+        self.level_map = level_map
+        self.seed = seed
+
+        #Every game plays on the same map, so one tile grid describes them all
+        level = zombie_knight.ChunkedMap(level_map, 32, zombie_knight.CHUNK_SIZE)
+        self.tiles = level.platforms[1:-1, 1:-1].astype(np.uint8)
+
+        #Observations (filled in place every step, so copy them to keep them)
+        #player: x, y (bottom left), x velocity, y velocity, health
+        #zombies: x, y, x velocity, ZOMBIE_ state; rubies: x, y, present; game: night, seconds left in the night, score
+        self.player = np.zeros((env_count, 5), dtype=np.float32)
+        self.zombies = np.zeros((env_count, max_zombies, 4), dtype=np.float32)
+        self.rubies = np.zeros((env_count, max_rubies, 3), dtype=np.float32)
+        self.game = np.zeros((env_count, 3), dtype=np.float32)
+        self.observations = {
+            "tiles": self.tiles,
+            "player": self.player,
+            "zombies": self.zombies,
+            "rubies": self.rubies,
+            "game": self.game,
+        }
+
+        #Step results
+        self.rewards = np.zeros(env_count, dtype=np.float32)
+        self.terminated = np.zeros(env_count, dtype=bool)
+        self.truncated = np.zeros(env_count, dtype=bool)
+        self.episode_steps = np.zeros(env_count, dtype=int)
+        self.scores = np.zeros(env_count, dtype=int)
+        self.episodes = np.zeros(env_count, dtype=int)
+
+        self.engines = []
+        self.kinematics = None
+
+        #Optional seconds spent in each part of step, to show where the time goes (the games' own phases are in their profilers)
+        self.step_times = None
+
+    def reset(self, seed=None):
+        """Start every game over (game i uses seed + i) and return the observations.
+        The games are only built the first time, after that they are reset in place"""
+        if seed is not None:
+            self.seed = seed
+
+        if self.engines:
+            for i, engine in enumerate(self.engines):
+                engine.reset(self.seed + i)
+        else:
+            #Every zombie and ruby of every game is moved by one shared kinematics engine
+            self.kinematics = zombie_knight.Kinematics(zombie_knight.ChunkedMap(self.level_map, 32, zombie_knight.CHUNK_SIZE), 64 * self.env_count)
+            for i in range(self.env_count):
+                engine = zombie_knight.Engine(self.level_map, render=False, interactive=False, seed=self.seed + i, kinematics=self.kinematics)
+                #Games end far too often here to collect garbage every time
+                engine.game.collect_garbage = False
+                self.engines.append(engine)
+
+        self.episode_steps[:] = 0
+        self.scores[:] = 0
+        self.episodes[:] = 0
+        self.observe()
+        return self.observations
+
+    def step(self, actions):
+        """Play one action (an index into ACTIONS) in every game for frame_skip frames.
+        Returns (observations, rewards, terminated, truncated, info). Rewards are points scored.
+        A game that ends is started over straight away, so its observation is the first of the next game"""
+        inputs = ACTIONS[actions].tolist()
+        self.terminated[:] = False
+        self.truncated[:] = False
+
+        step_times = self.step_times
+        for frame in range(self.frame_skip):
+            start_time = time.perf_counter()
+            self.kinematics.update()
+            kinematics_time = time.perf_counter()
+            for i, engine in enumerate(self.engines):
+                #A game that ended during this step sits out the rest of it
+                if not self.terminated[i]:
+                    engine.profiler.start_frame()
+                    engine.update(inputs[i])
+                    engine.profiler.end_frame()
+                    if engine.player.health <= 0:
+                        self.terminated[i] = True
+            if step_times is not None:
+                step_times['kinematics'] += kinematics_time - start_time
+                step_times['games'] += time.perf_counter() - kinematics_time
+
+        start_time = time.perf_counter()
+        self.episode_steps += 1
+        if self.max_episode_steps:
+            self.truncated[:] = ~self.terminated & (self.episode_steps >= self.max_episode_steps)
+
+        #Rewards for every game at once, then only the games that ended are started over
+        scores = np.fromiter((engine.game.score for engine in self.engines), dtype=int, count=self.env_count)
+        self.rewards[:] = scores - self.scores
+        self.scores[:] = scores
+        for i in np.flatnonzero(self.terminated | self.truncated):
+            self.episodes[i] += 1
+            self.engines[i].reset(int(self.seed + i + self.episodes[i] * self.env_count))
+            self.scores[i] = 0
+            self.episode_steps[i] = 0
+        observe_time = time.perf_counter()
+
+        self.observe()
+        if step_times is not None:
+            step_times['rewards'] += observe_time - start_time
+            step_times['observe'] += time.perf_counter() - observe_time
+            step_times['steps'] += 1
+        return self.observations, self.rewards, self.terminated, self.truncated, {}
+
+    def observe(self):
+        """Fill the observation arrays from the games"""
+        kinematics = self.kinematics
+        max_zombies = self.zombies.shape[1]
+        max_rubies = self.rubies.shape[1]
+        self.zombies[:] = 0
+        self.rubies[:] = 0
+
+        self.player[:] = [(engine.player.position.x, engine.player.position.y, engine.player.velocity.x, engine.player.velocity.y, engine.player.health) for engine in self.engines]
+        self.game[:] = [(engine.game.round_number, engine.game.round_time, engine.game.score) for engine in self.engines]
+
+        #Collect the kinematics slots of every game's zombies and rubies (with the game and row each one goes in),
+        #then read them all straight out of the kinematics arrays in one go
+        zombie_slots, zombie_games, zombie_rows = [], [], []
+        ruby_slots, ruby_games, ruby_rows = [], [], []
+        for i, engine in enumerate(self.engines):
+            for row, zombie in enumerate(engine.zombie_group):
+                if row == max_zombies:
+                    break
+                zombie_slots.append(zombie.slot)
+                zombie_games.append(i)
+                zombie_rows.append(row)
+            for row, ruby in enumerate(engine.ruby_group):
+                if row == max_rubies:
+                    break
+                ruby_slots.append(ruby.slot)
+                ruby_games.append(i)
+                ruby_rows.append(row)
+
+        if zombie_slots:
+            self.zombies[zombie_games, zombie_rows, :2] = kinematics.position[zombie_slots]
+            self.zombies[zombie_games, zombie_rows, 2] = kinematics.velocity[zombie_slots, 0]
+            self.zombies[zombie_games, zombie_rows, 3] = np.where(kinematics.moving[zombie_slots], ZOMBIE_WALKING, ZOMBIE_DEAD)
+        if ruby_slots:
+            self.rubies[ruby_games, ruby_rows, :2] = kinematics.position[ruby_slots]
+            self.rubies[ruby_games, ruby_rows, 2] = 1
+
+    def start_breakdown(self):
+        """Start timing each part of step: the shared kinematics, the games one by one, rewards and observations.
+        Each game's profiler also times its own phases (its collisions are in 'game')"""
+        self.step_times = dict.fromkeys(('kinematics', 'games', 'rewards', 'observe', 'steps'), 0)
+        for engine in self.engines:
+            engine.profiler.enabled = True
+
+    def get_breakdown(self):
+        """Return the average milliseconds per step of each part of step, and of each game phase summed over every game"""
+        steps = max(self.step_times['steps'], 1)
+        breakdown = {part: seconds * 1000 / steps for part, seconds in self.step_times.items() if part != 'steps'}
+
+        #The profilers hold per frame averages for one game; a step runs every game frame_skip times
+        game_phases = dict.fromkeys(zombie_knight.PROFILE_PHASES, 0.0)
+        for engine in self.engines:
+            for phase, milliseconds in engine.profiler.get_averages().items():
+                game_phases[phase] += milliseconds * self.frame_skip
+        return breakdown, {phase: milliseconds for phase, milliseconds in game_phases.items() if milliseconds > 0}
+
+def main():
+    """Measure how many frames per second random actions can be stepped at"""
+    parser = argparse.ArgumentParser(description="Step Zombie Knight games in lockstep with random actions")
+    parser.add_argument('--envs', type=int, default=64, help="games stepped together")
+    parser.add_argument('--steps', type=int, default=1000, help="steps to time")
+    parser.add_argument('--frame-skip', type=int, default=1, help="frames each action is held for")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--breakdown', action='store_true', help="also print the milliseconds each part of a step takes")
+    arguments = parser.parse_args()
+
+    env = VectorEnv(arguments.envs, arguments.seed, arguments.frame_skip)
+    env.reset()
+    if arguments.breakdown:
+        env.start_breakdown()
+    rng = np.random.default_rng(arguments.seed)
+
+    start_time = time.perf_counter()
+    games_over = 0
+    for i in range(arguments.steps):
+        observations, rewards, terminated, truncated, info = env.step(rng.integers(len(ACTIONS), size=arguments.envs))
+        games_over += int(terminated.sum())
+    elapsed = time.perf_counter() - start_time
+
+    frames = arguments.steps * arguments.envs * arguments.frame_skip
+    print(f"{frames} frames in {elapsed:.1f}s ({frames / elapsed:.0f} frames/s), {games_over} games over")
+
+    if arguments.breakdown:
+        breakdown, game_phases = env.get_breakdown()
+        print("ms per step: " + ", ".join(f"{part} {milliseconds:.2f}" for part, milliseconds in breakdown.items()))
+        print("of which the games spent (last 240 frames of each): " + ", ".join(f"{phase} {milliseconds:.2f}" for phase, milliseconds in game_phases.items()))
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,686 @@
-from os.path import join
-import pygame, random, sys
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from os.path import exists, join
+import csv, gc, heapq, json, math, mmap, os, pygame, random, sys, threading, time, zlib
+import numpy as np
 #Use 2D vectors
 vector = pygame.math.Vector2
 
-#Initialize Pygame
-pygame.init()
-
-#Set display surface (Tile size is 32x32 so 1280/32 = 40 tiles wide and 736/32 = 23 tiles height)
+#Set display size (Tile size is 32x32 so 1280/32 = 40 tiles wide and 736/32 = 23 tiles height)
 WINDOW_WIDTH = 1280
 WINDOW_HEIGHT = 736
-display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-pygame.display.set_caption("Zombie Knight")
 
-#Set FPS and Clock
+#Set FPS (the simulation always steps at this rate) and how often the window may be redrawn
 FPS = 60
-clock = pygame.time.Clock()
+MAX_RENDER_FPS = 120
+
+#Seconds of game time each simulation step covers (sprites are updated with it)
+STEP_TIME = 1 / FPS
+
+#Most simulation steps to run before a frame has to be drawn (steps are never dropped, only delayed)
+MAX_FRAME_SKIP = 5
+
+#Sprites that moved further than this in one step (portals, wrap around) are not interpolated
+MAX_INTERPOLATION_DISTANCE = 64
+
+#Input flags passed to Engine.step (held keys and keys pressed this frame)
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_JUMP = 4
+INPUT_SLASH = 8
+INPUT_PAUSE = 16
+
+#Parts of a frame the profiler times (and the color each is graphed in)
+PROFILE_PHASES = ('events', 'kinematics', 'tiles', 'sprites', 'game', 'clear', 'draw', 'hud', 'display', 'idle')
+PROFILE_COLORS = ((200, 200, 200), (255, 120, 0), (140, 90, 40), (255, 220, 0), (220, 40, 40),
+                  (60, 120, 255), (0, 200, 255), (180, 80, 255), (0, 220, 100), (70, 70, 70))
+
+#Tiles along each side of a map chunk and how far outside the window chunks are loaded and released (in pixels)
+CHUNK_SIZE = 16
+CHUNK_LOAD_MARGIN = 256
+CHUNK_RELEASE_MARGIN = 768
+
+#Sizes the world can be drawn at before being scaled up to the window (the HUD is always drawn at full size).
+#Each scales back up by a whole number, which is much cheaper than in-between sizes and keeps the level free of seams
+RENDER_SCALES = (1, .5)
+
+#Levels of detail the quality governor steps down through when frames run long, as (steps between frames of decorative animation,
+#steps between frames of sprites far from the player). Portals and ruby makers slow down first, then far away zombies and rubies. The player always animates every step
+DETAIL_TIERS = ((1, 1), (2, 1), (4, 1), (4, 2), (8, 4))
+FAR_DETAIL_DISTANCE = 384
+
+#Sprites made up front for each pool (pools still grow if a night needs more)
+POOL_SIZES = {'bullet': 16, 'zombie': 64, 'ruby': 32}
+
+#The display surface and shared assets are created by setup() so the module can be imported
+display_surface = None
+asset_loader = None
+asset_cache = None
+sound_bank = None
+
+#How often (in milliseconds) the title screen redraws the progress bar while assets are loading
+LOADING_REFRESH = 50
 
 #Define classes
+class AssetLoader():
+    """A class to decode image and sound files on worker threads so the window can open before they are loaded"""
+
+    def __init__(self, worker_count):
+        """Initialize the asset loader"""
+        self.executor = ThreadPoolExecutor(worker_count, thread_name_prefix='asset_loader')
+
+        #Files being decoded (or decoded and not picked up yet) stored by path
+        self.jobs = {}
+
+        #Progress (finished is counted on the worker threads)
+        self.submitted = 0
+        self.finished = 0
+        self.lock = threading.Lock()
+
+    def submit(self, paths, decode):
+        """Start decoding files with decode(path) in the background"""
+        for path in paths:
+            if path not in self.jobs:
+                self.submitted += 1
+                self.jobs[path] = self.executor.submit(decode, path)
+                self.jobs[path].add_done_callback(self.finish)
+
+    def finish(self, job):
+        """Count a decoded file"""
+        with self.lock:
+            self.finished += 1
+
+    def get(self, path, decode):
+        """Return a decoded file, only waiting for that one file if it is still being decoded.
+        Files that were never submitted (or were already picked up) are decoded here"""
+        job = self.jobs.pop(path, None)
+        if job is None:
+            return decode(path)
+        return job.result()
+
+    def get_progress(self):
+        """Return how much of what was submitted is decoded, from 0 to 1"""
+        if self.submitted == 0:
+            return 1
+        return self.finished / self.submitted
+
+    def is_loading(self):
+        """True while files are still being decoded"""
+        return self.finished < self.submitted
+
+    def shutdown(self):
+        """Drop the files that haven't started decoding and wait for the ones that have (call before pygame quits)"""
+        self.executor.shutdown(cancel_futures=True)
+
+class AssetCache():
+    """A class to load sprite frames once and share them between every sprite"""
+
+    def __init__(self, loader):
+        """Initialize the asset cache. Files are picked up from the loader (which may already be decoding them)"""
+        self.loader = loader
+
+        #Frames are stored by (path, size, flip), animations by (paths, size, flip) and clips by (paths, size, fps, mode, flip)
+        self.frames = {}
+        self.animations = {}
+        self.clips = {}
+
+        #Pre-scaled frames cut out of the baked atlas, stored by (path, size)
+        self.atlas = None
+        self.atlas_frames = {}
+
+        #Collision masks computed once for every frame, stored by frame
+        self.masks = {}
+
+        #Frames shrunk for drawing below full resolution, stored by scale as ScaledFrames
+        self.scaled_frames = {}
+
+        #Cache statistics
+        self.hits = 0
+        self.misses = 0
+        self.resident_bytes = 0
+
+    def load_frame(self, path, size, flip=False):
+        """Return a scaled (and flipped) frame, only touching disk the first time"""
+        key = (path, size, flip)
+        if key in self.frames:
+            self.hits += 1
+            return self.frames[key]
+
+        self.misses += 1
+        if flip:
+            #Flipped frames are built from the cached unflipped frame
+            frame = pygame.transform.flip(self.load_frame(path, size), True, False)
+        elif (path, size) in self.atlas_frames:
+            #Atlas frames are subsurfaces, so they don't add to the resident bytes
+            frame = self.atlas_frames[(path, size)]
+            self.frames[key] = frame
+            self.masks[frame] = pygame.mask.from_surface(frame)
+            return frame
+        else:
+            frame = pygame.transform.scale(self.load_image(path), size).convert_alpha()
+
+        self.frames[key] = frame
+        self.masks[frame] = pygame.mask.from_surface(frame)
+        self.resident_bytes += frame.get_pitch() * frame.get_height()
+        return frame
+
+    def load_image(self, path):
+        """Return an image file as it was decoded (not scaled or converted)"""
+        return self.loader.get(path, pygame.image.load)
+
+    def load_atlas(self, index_path, image_path):
+        """Memory-map a baked atlas (see bake_atlas.py) and cut a subsurface for every frame"""
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+
+        #Convert the mapped pixels to the display format once, then close the map
+        with open(image_path, 'rb') as atlas_file:
+            with mmap.mmap(atlas_file.fileno(), 0, access=mmap.ACCESS_COPY) as atlas_map:
+                self.atlas = pygame.image.frombuffer(atlas_map, (index["width"], index["height"]), 'RGBA').convert_alpha()
+        self.resident_bytes += self.atlas.get_pitch() * self.atlas.get_height()
+
+        for entry in index["frames"]:
+            path = join(*entry["path"].split('/'))
+            self.atlas_frames[(path, tuple(entry["size"]))] = self.atlas.subsurface(entry["rect"])
+
+    def load_frames(self, paths, size, flip=False):
+        """Return an immutable tuple of frames shared by every caller"""
+        paths = tuple(paths)
+        key = (paths, size, flip)
+        if key in self.animations:
+            self.hits += 1
+            return self.animations[key]
+
+        frames = tuple(self.load_frame(path, size, flip) for path in paths)
+        self.animations[key] = frames
+        return frames
+
+    def load_clip(self, paths, size, fps, mode='loop', flip=False):
+        """Return an animation clip shared by every caller"""
+        paths = tuple(paths)
+        key = (paths, size, fps, mode, flip)
+        if key not in self.clips:
+            self.clips[key] = AnimationClip(self.load_frames(paths, size, flip), fps, mode)
+        return self.clips[key]
+
+    def get_scaled_frames(self, scale):
+        """Return the frames shrunk by scale, stored by full size frame. Every cached frame is shrunk the first time a scale is used,
+        so drawing is just a lookup"""
+        if scale not in self.scaled_frames:
+            scaled_frames = self.scaled_frames[scale] = ScaledFrames(self, scale)
+            for frame in self.frames.values():
+                scaled_frames[frame]
+        return self.scaled_frames[scale]
+
+    def get_mask(self, frame):
+        """Return the precomputed collision mask of a cached frame"""
+        return self.masks[frame]
+
+    def get_stats(self):
+        """Return the cache hits, misses and resident bytes"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "frames": len(self.frames),
+            "resident_bytes": self.resident_bytes,
+        }
+
+class ScaledFrames(dict):
+    """Frames shrunk by one scale, stored by full size frame (a frame that isn't there yet is shrunk when it is asked for)"""
+
+    def __init__(self, asset_cache, scale):
+        """Initialize the shrunk frames"""
+        super().__init__()
+        self.asset_cache = asset_cache
+        self.scale = scale
+
+    def __missing__(self, frame):
+        """Shrink a frame and keep it"""
+        width, height = frame.get_size()
+        scaled = self[frame] = pygame.transform.scale(frame, (round(width * self.scale), round(height * self.scale)))
+        self.asset_cache.resident_bytes += scaled.get_pitch() * scaled.get_height()
+        return scaled
+
+class AnimationClip():
+    """A class to hold the frames of an animation and how fast and how it plays (shared by every sprite playing it)"""
+
+    def __init__(self, frames, fps, mode='loop'):
+        """Initialize the clip. mode is 'loop', 'once' (play through, then back to the first frame) or 'hold' (stop on the last frame)"""
+        self.frames = frames
+        self.fps = fps
+        self.mode = mode
+        self.duration = len(frames) / fps
+
+    def get_index(self, time):
+        """Return the index of the frame shown time seconds into the clip"""
+        #The small bias keeps frames that start exactly on a step from showing a step late
+        index = int(time * self.fps + 1e-9)
+        if self.mode == 'loop':
+            return index % len(self.frames)
+        if index < len(self.frames):
+            return index
+        return 0 if self.mode == 'once' else len(self.frames) - 1
+
+class Animator():
+    """A class to play animation clips for one sprite, driven by elapsed time instead of frames"""
+
+    def __init__(self, clip, time=0):
+        """Start playing a clip time seconds in"""
+        self.clip = clip
+        self.time = time
+        self.index = clip.get_index(time)
+        self.image = clip.frames[self.index]
+
+    @property
+    def finished(self):
+        """True once a 'once' or 'hold' clip has played all the way through"""
+        return self.clip.mode != 'loop' and self.time >= self.clip.duration
+
+    def play(self, clip, restart=True):
+        """Switch to a clip, from its start or (restart=False) from the same time. Playing the current clip does nothing"""
+        if clip is self.clip:
+            return
+        self.clip = clip
+        if restart:
+            self.time = 0
+        #Make the next update show the new clip's frame
+        self.index = None
+
+    def update(self, dt):
+        """Advance dt seconds (any number of steps costs the same). Returns True if the image changed"""
+        clip = self.clip
+        self.time += dt
+        #Looping clips (almost every animator) work out their frame here rather than through get_index
+        if clip.mode == 'loop':
+            if self.time >= clip.duration:
+                self.time %= clip.duration
+            index = int(self.time * clip.fps + 1e-9) % len(clip.frames)
+        else:
+            index = clip.get_index(self.time)
+        if index == self.index:
+            return False
+        self.index = index
+        self.image = clip.frames[index]
+        return True
+
+class SoundBank():
+    """A class to decode every sound once and play it through a fixed pool of channels"""
+
+    def __init__(self, channel_count, loader, enabled=True):
+        """Initialize the sound bank. Sounds are decoded by the loader. A disabled bank loads and plays nothing"""
+        self.enabled = enabled
+        self.loader = loader
+
+        #Reserve a fixed pool of mixer channels
+        if enabled:
+            pygame.mixer.set_num_channels(channel_count)
+            self.channels = [pygame.mixer.Channel(i) for i in range(channel_count)]
+        else:
+            self.channels = []
+
+        #Sounds are stored by name as [sound, max voices, priority] (sound is None until it has been picked up from the loader)
+        #and sounds that haven't been picked up by name as (path, volume)
+        self.sounds = {}
+        self.decoding = {}
+
+        #What each channel is playing as (name, priority)
+        self.channel_sounds = [None] * channel_count
+
+        #Sounds already started this frame and voices that were dropped
+        self.played_this_frame = set()
+        self.dropped_voices = 0
+
+    def load(self, name, path, volume, max_voices, priority):
+        """Start decoding a sound once. Higher priority sounds can steal channels from lower ones"""
+        if self.enabled and name not in self.sounds:
+            self.loader.submit([path], pygame.mixer.Sound)
+            self.sounds[name] = [None, max_voices, priority]
+            self.decoding[name] = (path, volume)
+
+    def get_sound(self, name):
+        """Return a decoded sound (waiting for it the first time if it is still being decoded)"""
+        if name in self.decoding:
+            path, volume = self.decoding.pop(name)
+            sound = self.loader.get(path, pygame.mixer.Sound)
+            sound.set_volume(volume)
+            self.sounds[name][0] = sound
+        return self.sounds[name][0]
+
+    def play(self, name, priority=None):
+        """Play a sound if it is under its voice limit and a channel can be found"""
+        #Many collisions in one frame only need one voice
+        if not self.enabled or name in self.played_this_frame:
+            return
+        self.played_this_frame.add(name)
+
+        sound, max_voices, default_priority = self.sounds[name]
+        if sound is None:
+            sound = self.get_sound(name)
+        if priority is None:
+            priority = default_priority
+
+        #Look for a free channel, count our voices and find the lowest priority channel to steal
+        free_channel = None
+        steal_channel = None
+        voices = 0
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                if free_channel is None:
+                    free_channel = i
+            elif self.channel_sounds[i] is not None:
+                playing_name, playing_priority = self.channel_sounds[i]
+                if playing_name == name:
+                    voices += 1
+                if playing_priority < priority and (steal_channel is None or playing_priority < self.channel_sounds[steal_channel][1]):
+                    steal_channel = i
+
+        #Drop the voice if the sound is at its limit or every channel is more important
+        if voices >= max_voices:
+            self.dropped_voices += 1
+            return
+        if free_channel is None:
+            if steal_channel is None:
+                self.dropped_voices += 1
+                return
+            free_channel = steal_channel
+
+        self.channels[free_channel].play(sound)
+        self.channel_sounds[free_channel] = (name, priority)
+
+    def update(self):
+        """Start a new frame"""
+        self.played_this_frame.clear()
+
+    def load_music(self, path, volume):
+        """Load the background music"""
+        if self.enabled:
+            pygame.mixer.music.load(path)
+            pygame.mixer.music.set_volume(volume)
+
+    def play_music(self):
+        """Start the music, looping forever"""
+        if self.enabled:
+            pygame.mixer.music.play(-1, 0.0, 2000)
+
+    def pause_music(self):
+        """Pause the music"""
+        if self.enabled:
+            pygame.mixer.music.pause()
+
+    def unpause_music(self):
+        """Unpause the music"""
+        if self.enabled:
+            pygame.mixer.music.unpause()
+
+    def stop_music(self):
+        """Stop the music"""
+        if self.enabled:
+            pygame.mixer.music.stop()
+
+class TextCache():
+    """A class to render each piece of text once and reuse the surface"""
+
+    def __init__(self, max_size):
+        """Initialize the text cache"""
+        self.max_size = max_size
+        self.surfaces = {}
+
+    def render(self, font, text, color):
+        """Return the rendered text, only rendering it the first time"""
+        key = (font, text, color)
+        if key not in self.surfaces:
+            #Text like the final score changes every game, so don't let the cache grow forever
+            if len(self.surfaces) >= self.max_size:
+                self.surfaces.clear()
+            self.surfaces[key] = font.render(text, True, color)
+        return self.surfaces[key]
+
+class GlyphAtlas():
+    """A class to draw numbers from pre-rendered digit glyphs"""
+
+    def __init__(self, font, color):
+        """Render each digit once"""
+        self.glyphs = {character: font.render(character, True, color) for character in '-0123456789'}
+        self.height = font.get_height()
+
+    def get_width(self, text):
+        """Return the width of a number drawn from the glyphs"""
+        return sum(self.glyphs[character].get_width() for character in text)
+
+    def draw(self, surface, text, position):
+        """Draw a number with its top left corner at the position"""
+        x, y = position
+        for character in text:
+            glyph = self.glyphs[character]
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+class HUDLabel():
+    """A label with a fixed prefix and a number that is only redrawn when the number changes"""
+
+    def __init__(self, prefix_text, glyph_atlas):
+        """Initialize the label"""
+        self.prefix_text = prefix_text
+        self.glyph_atlas = glyph_atlas
+        self.value = None
+        self.image = None
+
+    def set_value(self, value):
+        """Rebuild the label image if the value changed"""
+        if value == self.value:
+            return
+
+        self.value = value
+        number = str(value)
+        prefix_width = self.prefix_text.get_width()
+        width = prefix_width + self.glyph_atlas.get_width(number)
+        height = max(self.prefix_text.get_height(), self.glyph_atlas.height)
+
+        self.image = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.image.blit(self.prefix_text, (0, 0))
+        self.glyph_atlas.draw(self.image, number, (prefix_width, 0))
+
+class SpatialHash():
+    """A uniform grid used to find pairs of sprites that might be touching"""
+
+    def __init__(self, cell_size):
+        """Initialize the spatial hash"""
+        self.cell_size = cell_size
+
+        #Sprites stored by (tag, cell) as (order, sprite) and the cells used by each tag
+        self.cells = {}
+        self.tag_cells = {}
+
+    def insert(self, tag, sprites):
+        """Replace the sprites stored under a tag, remembering the order they came in"""
+        cells = self.cells
+        cell_size = self.cell_size
+        for key in self.tag_cells.get(tag, ()):
+            del cells[key]
+        tag_cells = self.tag_cells[tag] = []
+
+        for order, sprite in enumerate(sprites):
+            rect = sprite.rect
+            columns = range(rect.left // cell_size, (rect.right - 1) // cell_size + 1)
+            for row in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                for column in columns:
+                    key = (tag, row, column)
+                    cell = cells.get(key)
+                    if cell is None:
+                        cell = cells[key] = []
+                        tag_cells.append(key)
+                    cell.append((order, sprite))
+
+    def get_pairs(self, tag_a, tag_b):
+        """Return every (a, b) pair that shares a cell, once, in the order the sprites were inserted"""
+        pairs = {}
+        for key in self.tag_cells.get(tag_a, ()):
+            others = self.cells.get((tag_b, key[1], key[2]))
+            if others:
+                for order_a, sprite_a in self.cells[key]:
+                    for order_b, sprite_b in others:
+                        pairs[(order_a, order_b)] = (sprite_a, sprite_b)
+
+        return [pairs[key] for key in sorted(pairs)]
+
+class ScreenRenderer():
+    """A class to pre-render the still screens (title, controls, pause and game over)"""
+
+    def __init__(self, title_font, text_font, text_cache):
+        """Initialize the screen renderer"""
+        self.title_font = title_font
+        self.text_font = text_font
+        self.text_cache = text_cache
+
+        #Screens already rendered
+        self.screens = {}
+        self.controls_screen = None
+
+    def draw_progress(self, surface, progress):
+        """Draw a loading bar (progress from 0 to 1) across the bottom of a screen"""
+        WHITE = (255, 255, 255)
+        GREEN = (25, 200, 25)
+
+        bar_rect = pygame.Rect(0, 0, WINDOW_WIDTH / 2, 16)
+        bar_rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT - 96)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = int(bar_rect.width * progress)
+        pygame.draw.rect(surface, GREEN, fill_rect)
+        pygame.draw.rect(surface, WHITE, bar_rect, 2)
+        return bar_rect
+
+    def get_screen(self, main_text, sub_text):
+        """Return a pre-rendered screen with main text and sub text"""
+        if (main_text, sub_text) in self.screens:
+            return self.screens[(main_text, sub_text)]
+
+        #Set Colors 
+        WHITE = (255, 255, 255)
+        BLACK = (0, 0, 0)
+        GREEN = (25, 200, 25)
+
+        #Create main text
+        main_text_image = self.text_cache.render(self.title_font, main_text, GREEN)
+        main_rect = main_text_image.get_rect()
+        main_rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+
+        #Create sub text
+        sub_text_image = self.text_cache.render(self.title_font, sub_text, WHITE)
+        sub_rect = sub_text_image.get_rect()
+        sub_rect.center = (WINDOW_WIDTH /2, WINDOW_HEIGHT / 2 + 64)
+
+        #Draw the screen
+        screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+        screen.fill(BLACK)
+        screen.blit(main_text_image, main_rect)
+        screen.blit(sub_text_image, sub_rect)
+
+        #Game over screens change with every score, so only keep a few
+        if len(self.screens) >= 8:
+            self.screens.pop(next(iter(self.screens)))
+        self.screens[(main_text, sub_text)] = screen
+        return screen
+
+    def get_controls_screen(self):
+        """Return the pre-rendered page that displays the game controls"""
+        if self.controls_screen:
+            return self.controls_screen
+
+        #Set Colors 
+        WHITE = (255, 255, 255)
+        BLACK = (0, 0, 0)
+        GREEN = (25, 200, 25)
+
+        title_text = self.text_cache.render(self.title_font, "Game Controls", WHITE)
+        title_rect = title_text.get_rect()
+        title_rect.center = (WINDOW_WIDTH/ 2, 25)
+        
+        body_text_1 = self.text_cache.render(self.text_font, "Use the <- and -> Arrow keys to move your Knight Left and Right", GREEN)
+        body_text_1_rect = body_text_1.get_rect()
+        body_text_1_rect.topleft = (100, 96)
+        
+        body_text_2 = self.text_cache.render(self.text_font, "Use the (UP) Arrow key to slash your sword at an on coming zombie", GREEN)
+        body_text_2_rect = body_text_2.get_rect()
+        body_text_2_rect.topleft = (100, 144)
+        
+        body_text_3 = self.text_cache.render(self.text_font, "Use the (SPACE BAR) to Jump from platform or to avoid zombies.", GREEN)
+        body_text_3_rect = body_text_3.get_rect()
+        body_text_3_rect.topleft = (100, 192)
+        
+        title_text_2 = self.text_cache.render(self.title_font, "Game Rules", WHITE)
+        title_rect_2 = title_text_2.get_rect()
+        title_rect_2.center = (WINDOW_WIDTH/ 2, 250)
+
+        body_text_4 = self.text_cache.render(self.text_font, "The goal of the game is to survive the night with out dying.", GREEN)
+        body_text_4_rect = body_text_4.get_rect()
+        body_text_4_rect.topleft = (75, 298)
+
+        body_text_5 = self.text_cache.render(self.text_font, "To do this you will need to kill zombies and collect rubies.", GREEN)
+        body_text_5_rect = body_text_5.get_rect()
+        body_text_5_rect.topleft = (75, 346)
+
+        body_text_6 = self.text_cache.render(self.text_font, "To kill a zombie you will need to hit them with our slash attack (UP) Arrow.", GREEN)
+        body_text_6_rect = body_text_6.get_rect()
+        body_text_6_rect.topleft = (75, 394)
+
+        body_text_7 = self.text_cache.render(self.text_font, "Once a zombie is down you will need to stomp on them by running them over.", GREEN)
+        body_text_7_rect = body_text_7.get_rect()
+        body_text_7_rect.topleft = (75, 442)
+
+        body_text_8 = self.text_cache.render(self.text_font, "Collecting a Ruby will give you a score bonus and health.", GREEN)
+        body_text_8_rect = body_text_8.get_rect()
+        body_text_8_rect.topleft = (75, 490)
+
+        body_text_9 = self.text_cache.render(self.text_font, "If a zombie collects a Ruby another zombie will appear immediately!", GREEN)
+        body_text_9_rect = body_text_9.get_rect()
+        body_text_9_rect.topleft = (75, 538)
+
+        body_text_10 = self.text_cache.render(self.text_font, "Use the portals in the connors to move quickly around the screen.", GREEN)
+        body_text_10_rect = body_text_10.get_rect()
+        body_text_10_rect.topleft = (75, 586)
+
+        body_text_11 = self.text_cache.render(self.text_font, "Try surviving as many nights as you can to get a huge high score.", GREEN)
+        body_text_11_rect = body_text_11.get_rect()
+        body_text_11_rect.topleft = (75, 634)
+
+        body_text_12 = self.text_cache.render(self.text_font, "GOOD LUCK SURVIVING THE NIGHT! Press ENTER to begin!", GREEN)
+        body_text_12_rect = body_text_12.get_rect()
+        body_text_12_rect.center = (WINDOW_WIDTH /2 , 700)
+
+        #Draw the page
+        screen = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT)).convert()
+        screen.fill(BLACK)
+        screen.blit(title_text, title_rect)
+        pygame.draw.line(screen, WHITE, title_rect.bottomleft, title_rect.bottomright, 3)
+        screen.blit(body_text_1, body_text_1_rect)
+        screen.blit(body_text_2, body_text_2_rect)
+        screen.blit(body_text_3, body_text_3_rect)
+        screen.blit(title_text_2, title_rect_2)
+        pygame.draw.line(screen, WHITE, title_rect_2.bottomleft, title_rect_2.bottomright, 3)
+        screen.blit(body_text_4, body_text_4_rect)
+        screen.blit(body_text_5, body_text_5_rect)
+        screen.blit(body_text_6, body_text_6_rect)
+        screen.blit(body_text_7, body_text_7_rect)
+        screen.blit(body_text_8, body_text_8_rect)
+        screen.blit(body_text_9, body_text_9_rect)
+        screen.blit(body_text_10, body_text_10_rect)
+        screen.blit(body_text_11, body_text_11_rect)
+        screen.blit(body_text_12, body_text_12_rect)
+
+        self.controls_screen = screen
+        return screen
+
 class Game():
     """A class to manage gameplay"""
 
-    def __init__(self, player, zombie_group, platform_group, portal_group, bullet_group, ruby_group):
-        """Initialize the game"""
+    def __init__(self, player, zombie_group, platform_group, portal_group, bullet_group, ruby_group, zombie_pool, ruby_pool, rng, interactive=True):
+        """Initialize the game. Everything random comes from rng. A game that isn't interactive never waits on pause screens"""
         #Set constant variables
         self.STARTING_ROUND_TIME = 30
         self.STARTING_ZOMBIE_CREATION_TIME = 5
+        self.ZOMBIE_SPEED_BONUS = 5  #Zombies walk between the night number and this plus the night number fast
+        self.ZOMBIE_DAMAGE = 20
+        self.RUBY_HEAL = 10
 
         #Set game values
         self.score = 0
@@ -37,13 +693,14 @@ class Game():
         self.title_font = pygame.font.Font(join('Assets', 'fonts', 'Poultrygeist.ttf'), 48)
         self.HUD_font = pygame.font.Font(join('Assets', 'fonts', 'Pixel.ttf'), 24)
 
-        #Set sounds
-        self.lost_ruby_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'lost_ruby.wav'))
-        self.lost_ruby_sound.set_volume(.15)
-        self.ruby_pickup_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'ruby_pickup.wav'))
-        self.ruby_pickup_sound.set_volume(.15)
-        pygame.mixer.music.load(join('Assets', 'sounds', 'level_music.wav'))
-        pygame.mixer.music.set_volume(.25)
+        #Set HUD text (labels only change when their values do)
+        WHITE = (255, 255, 255)
+        self.text_cache = TextCache(64)
+        self.HUD_glyphs = GlyphAtlas(self.HUD_font, WHITE)
+        self.score_label = HUDLabel(self.text_cache.render(self.HUD_font, "Score: ", WHITE), self.HUD_glyphs)
+        self.health_label = HUDLabel(self.text_cache.render(self.HUD_font, "Health: ", WHITE), self.HUD_glyphs)
+        self.round_label = HUDLabel(self.text_cache.render(self.HUD_font, "Night: ", WHITE), self.HUD_glyphs)
+        self.time_label = HUDLabel(self.text_cache.render(self.HUD_font, "Sunrise In: ", WHITE), self.HUD_glyphs)
 
         #Attach groups and sprites
         self.player = player
@@ -52,6 +709,25 @@ class Game():
         self.portal_group = portal_group
         self.bullet_group = bullet_group
         self.ruby_group = ruby_group
+        self.zombie_pool = zombie_pool
+        self.ruby_pool = ruby_pool
+
+        #The only random number generator the simulation uses (seeded so runs can be replayed)
+        self.random = rng
+
+        #Broadphase grid for collisions between moving sprites
+        self.broadphase = SpatialHash(128)
+
+        #Game state owned by whoever runs the game
+        self.interactive = interactive
+        self.renderer = None
+        #Collect garbage between nights and games (turned off by runners that end games all the time)
+        self.collect_garbage = True
+
+        #Pause screens waiting to be shown by the main loop and the screens already rendered
+        self.pending_screens = []
+        self.restart_music = False
+        self.screen_renderer = ScreenRenderer(self.title_font, self.HUD_font, self.text_cache)
 
     def update(self):
         """Update the game"""
@@ -69,36 +745,37 @@ class Game():
     def draw(self):
         """Draw the game HUD"""
         #Set Colors
-        WHITE = (255, 255, 255)
         GREEN = (25, 200, 25)
 
         #Set Text
-        score_text = self.HUD_font.render(f"Score: {self.score}", True, WHITE)
-        score_rect = score_text.get_rect()
+        self.score_label.set_value(self.score)
+        score_rect = self.score_label.image.get_rect()
         score_rect.topleft = (10, WINDOW_HEIGHT - 50)
 
-        health_text = self.HUD_font.render(f"Health: {self.player.health}", True, WHITE)
-        health_rect = health_text.get_rect()
+        self.health_label.set_value(self.player.health)
+        health_rect = self.health_label.image.get_rect()
         health_rect.topleft = (10, WINDOW_HEIGHT - 25)
 
-        title_text = self.title_font.render("Zombie Knight", True, GREEN)
+        title_text = self.text_cache.render(self.title_font, "Zombie Knight", GREEN)
         title_rect = title_text.get_rect()
         title_rect.center = (WINDOW_WIDTH/2, WINDOW_HEIGHT - 25)
 
-        round_text = self.HUD_font.render(f"Night: {self.round_number}", True, WHITE)
-        round_rect = round_text.get_rect()
+        self.round_label.set_value(self.round_number)
+        round_rect = self.round_label.image.get_rect()
         round_rect.topright = (WINDOW_WIDTH - 10, WINDOW_HEIGHT - 50)
 
-        time_text = self.HUD_font.render(f"Sunrise In: {self.round_time}", True, WHITE)
-        time_rect = time_text.get_rect()
+        self.time_label.set_value(self.round_time)
+        time_rect = self.time_label.image.get_rect()
         time_rect.topright = (WINDOW_WIDTH - 10, WINDOW_HEIGHT - 25)
 
-        #Draw the HUD
-        display_surface.blit(score_text, score_rect)
-        display_surface.blit(health_text, health_rect)
-        display_surface.blit(title_text, title_rect)
-        display_surface.blit(round_text, round_rect)
-        display_surface.blit(time_text, time_rect)
+        #Draw the HUD and return the areas that were drawn
+        return [
+            display_surface.blit(self.score_label.image, score_rect),
+            display_surface.blit(self.health_label.image, health_rect),
+            display_surface.blit(title_text, title_rect),
+            display_surface.blit(self.round_label.image, round_rect),
+            display_surface.blit(self.time_label.image, time_rect),
+        ]
 
     def add_zombie(self):
         """Add a zombie to the game"""
@@ -106,55 +783,72 @@ class Game():
         if self.frame_count % FPS == 0:
             #Only add a zombie if a zombie creation time has passed
             if self.round_time % self.zombie_creation_time == 0:
-                zombie = Zombie(self.platform_group, self.portal_group, self.round_number, 5 + self.round_number)
+                zombie = self.zombie_pool.acquire(self.random, self.round_number, self.ZOMBIE_SPEED_BONUS + self.round_number)
                 self.zombie_group.add(zombie)
 
     def check_collisions(self):
         """Check collisions that affect gameplay"""
+        #Broadphase: put every bullet, zombie and the player in the grid so only nearby sprites are tested
+        self.broadphase.insert('bullet', self.bullet_group)
+        self.broadphase.insert('zombie', self.zombie_group)
+        self.broadphase.insert('player', [self.player])
+
         #See if any bullet in the bullet group hits a zombie in the zombie group
-        collision_dict = pygame.sprite.groupcollide(self.bullet_group, self.zombie_group, True, False)
-        if collision_dict:
-            for zombies in collision_dict.values():
-                for zombie in zombies:
-                    zombie.hit_sound.play()
-                    zombie.is_dead = True
-                    zombie.animate_death = True
+        for bullet, zombie in self.broadphase.get_pairs('bullet', 'zombie'):
+            if bullet.rect.colliderect(zombie.rect):
+                bullet.kill()
+                sound_bank.play('zombie_hit')
+                zombie.is_dead = True
+                zombie.animate_death = True
         
         #See if a player stomped a dead zombie to finish it or collided with a live zombie to take damage. 
-        collision_list = pygame.sprite.spritecollide(self.player, self.zombie_group, False, pygame.sprite.collide_mask)
-        if collision_list:
-            for zombie in collision_list:
-                #The zombie is dead; Stomp it
-                if zombie.is_dead == True:
-                    zombie.kick_sound.play()
-                    zombie.kill()
-                    self.score += 25
-                    ruby = Ruby(self.platform_group, self.portal_group)
-                    self.ruby_group.add(ruby)
-
-                #The zombie isn't dead; Take damage
-                else:
-                    self.player.health -= 20 
-                    self.player.hit_sound.play()
-                    #Move the player to not continually take damage
-                    self.player.position.x -= 256 *zombie.direction
-                    self.player.rect.bottomleft = self.player.position
+        collision_list = [zombie for player, zombie in self.broadphase.get_pairs('player', 'zombie') if pygame.sprite.collide_mask(player, zombie)]
+        for zombie in collision_list:
+            #The zombie is dead; Stomp it
+            if zombie.is_dead == True:
+                sound_bank.play('zombie_kick')
+                zombie.kill()
+                self.score += 25
+                ruby = self.ruby_pool.acquire(self.random)
+                self.ruby_group.add(ruby)
+
+            #The zombie isn't dead; Take damage
+            else:
+                self.player.health -= self.ZOMBIE_DAMAGE
+                sound_bank.play('player_hit')
+                #Move the player to not continually take damage
+                self.player.position.x -= 256 *zombie.direction
+                self.player.rect.bottomleft = self.player.position
+
+        #The player may have been moved and new rubies may have been made, so add them now
+        self.broadphase.insert('player', [self.player])
+        self.broadphase.insert('ruby', self.ruby_group)
 
         #See if a player collided with a ruby
-        if pygame.sprite.spritecollide(self.player, self.ruby_group, True, pygame.sprite.collide_mask):
-            self.ruby_pickup_sound.play()
+        collided_rubies = [ruby for player, ruby in self.broadphase.get_pairs('player', 'ruby') if pygame.sprite.collide_mask(player, ruby)]
+        if collided_rubies:
+            for ruby in collided_rubies:
+                ruby.kill()
+            sound_bank.play('ruby_pickup')
             self.score += 100
-            self.player.health += 10
+            self.player.health += self.RUBY_HEAL
             if self.player.health > self.player.STARTING_HEALTH:
                 self.player.health = self.player.STARTING_HEALTH
             
         #See if a living zombie collided with a ruby
-        for zombie in self.zombie_group:
-            if zombie.is_dead == False:
-                if pygame.sprite.spritecollide(zombie, self.ruby_group, True, pygame.sprite.collide_mask):
-                    self.lost_ruby_sound.play()
-                    zombie = Zombie(self.platform_group, self.portal_group, self.round_number, 5 + self.round_number)
-                    self.zombie_group.add(zombie)
+        zombies_with_rubies = []
+        for zombie, ruby in self.broadphase.get_pairs('zombie', 'ruby'):
+            #Skip stomped zombies and rubies that were already collected
+            if zombie.is_dead == False and zombie.alive() and ruby.alive():
+                if pygame.sprite.collide_mask(zombie, ruby):
+                    ruby.kill()
+                    if zombie not in zombies_with_rubies:
+                        zombies_with_rubies.append(zombie)
+
+        for zombie in zombies_with_rubies:
+            sound_bank.play('lost_ruby')
+            zombie = self.zombie_pool.acquire(self.random, self.round_number, self.ZOMBIE_SPEED_BONUS + self.round_number)
+            self.zombie_group.add(zombie)
 
     def check_round_completion(self):
         """Check if the player survived a single night"""
@@ -163,8 +857,8 @@ class Game():
 
     def check_game_over(self):
         """Check to see if the player lost the game"""
-        if self.player.health == 0:
-            pygame.mixer.music.stop()
+        if self.player.health <= 0:
+            sound_bank.stop_music()
             self.pause_game(f"Game Over! Final Score: {self.score}", "Press ENTER to play again...")
             self.rest_game()
 
@@ -179,63 +873,48 @@ class Game():
         #Reset round values
         self.round_time = self.STARTING_ROUND_TIME
 
-        #Empty group lists
+        #Empty group lists (the sprites go back to their pools)
         self.zombie_group.empty()
         self.ruby_group.empty()
         self.bullet_group.empty()
 
+        #Collect garbage between nights instead of during them
+        if self.collect_garbage:
+            gc.collect()
+
         #Rest the player
         self.player.reset()
 
         self.pause_game("You survived the night", "Press ENTER to continue...")
 
     def pause_game(self, main_text, sub_text):
-        """Pause the game"""
-        global running
-
-        pygame.mixer.music.pause()
-
-        #Set Colors 
-        WHITE = (255, 255, 255)
-        BLACK = (0, 0, 0)
-        GREEN = (25, 200, 25)
-
-        #Create main pause text
-        main_text = self.title_font.render(main_text, True, GREEN)
-        main_rect = main_text.get_rect()
-        main_rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
-
-        #Create sub pause text
-        sub_text = self.title_font.render(sub_text, True, WHITE)
-        sub_rect = sub_text.get_rect()
-        sub_rect.center = (WINDOW_WIDTH /2, WINDOW_HEIGHT / 2 + 64)
+        """Pause the game. The main loop shows the pause screen until the player presses ENTER"""
+        #Nobody is there to press ENTER
+        if not self.interactive:
+            return
+
+        sound_bank.pause_music()
+        self.pending_screens.append(self.screen_renderer.get_screen(main_text, sub_text))
+
+    def resume_game(self):
+        """Continue after the last pause screen"""
+        #Restart the music if the game was reset while paused, otherwise pick up where it left off
+        if self.restart_music:
+            self.restart_music = False
+            sound_bank.play_music()
+        else:
+            sound_bank.unpause_music()
 
-        #Display pause text
-        display_surface.fill(BLACK)
-        display_surface.blit(main_text, main_rect)
-        display_surface.blit(sub_text, sub_rect)
-        pygame.display.update()
-
-        #Pause the game until the user hits enter or quits
-        is_paused = True
-        while is_paused:
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
-                    #User wants to continue
-                    if event.key == pygame.K_RETURN:
-                        is_paused = False
-                        pygame.mixer.music.unpause()
-                #User wants to quit
-                if event.type == pygame.QUIT:
-                    is_paused = False
-                    running = False
-                    pygame.mixer.music.stop()
+        #The whole screen has to be redrawn after the pause
+        if self.renderer:
+            self.renderer.invalidate()
 
     def rest_game(self):
         """Rest the game"""
         #Reset game values
         self.score = 0
         self.round_number = 1
+        self.frame_count = 0
         self.round_time = self.STARTING_ROUND_TIME
         self.zombie_creation_time = self.STARTING_ZOMBIE_CREATION_TIME
 
@@ -243,185 +922,761 @@ class Game():
         self.player.health = self.player.STARTING_HEALTH
         self.player.reset()
 
-        #Empty sprite groups
+        #Empty sprite groups (the sprites go back to their pools)
         self.zombie_group.empty()
         self.ruby_group.empty()
         self.bullet_group.empty()
+        if self.collect_garbage:
+            gc.collect()
 
-        #Start music again
-        pygame.mixer.music.play(-1, 0.0, 2000)
-
-    def title_page(self, main_text, sub_text):
-        """Creating a Title Page"""
-        #Set Colors 
-        WHITE = (255, 255, 255)
-        BLACK = (0, 0, 0)
-        GREEN = (25, 200, 25)
-
-        #Create main pause text
-        main_text = self.title_font.render(main_text, True, GREEN)
-        main_rect = main_text.get_rect()
-        main_rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
-
-        #Create sub pause text
-        sub_text = self.title_font.render(sub_text, True, WHITE)
-        sub_rect = sub_text.get_rect()
-        sub_rect.center = (WINDOW_WIDTH /2, WINDOW_HEIGHT / 2 + 64)
-
-        #Display pause text
-        display_surface.fill(BLACK)
-        display_surface.blit(main_text, main_rect)
-        display_surface.blit(sub_text, sub_rect)
-        pygame.display.update()
-
-        #Pause the game until the user hits enter or quits
-        title_page = True
-        while title_page:
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
-                    #User wants to continue
-                    if event.key == pygame.K_RETURN:
-                        title_page = False
-                        self.controls_page()
-                #User wants to quit
-                if event.type == pygame.QUIT:
-                    sys.exit()
-
-    def controls_page(self):
-        """A page to display the game controls"""
-        #Set Colors 
-        WHITE = (255, 255, 255)
-        BLACK = (0, 0, 0)
-        GREEN = (25, 200, 25)
-
-        title_text = self.title_font.render("Game Controls", True, WHITE)
-        title_rect = title_text.get_rect()
-        title_rect.center = (WINDOW_WIDTH/ 2, 25)
-        
-        body_text_1 = self.HUD_font.render("Use the <- and -> Arrow keys to move your Knight Left and Right", True, GREEN)
-        body_text_1_rect = body_text_1.get_rect()
-        body_text_1_rect.topleft = (100, 96)
-        
-        body_text_2 = self.HUD_font.render("Use the (UP) Arrow key to slash your sword at an on coming zombie", True, GREEN)
-        body_text_2_rect = body_text_2.get_rect()
-        body_text_2_rect.topleft = (100, 144)
-        
-        body_text_3 = self.HUD_font.render("Use the (SPACE BAR) to Jump from platform or to avoid zombies.", True, GREEN)
-        body_text_3_rect = body_text_3.get_rect()
-        body_text_3_rect.topleft = (100, 192)
-        
-        title_text_2 = self.title_font.render("Game Rules", True, WHITE)
-        title_rect_2 = title_text_2.get_rect()
-        title_rect_2.center = (WINDOW_WIDTH/ 2, 250)
-
-        body_text_4 = self.HUD_font.render("The goal of the game is to survive the night with out dying.", True, GREEN)
-        body_text_4_rect = body_text_4.get_rect()
-        body_text_4_rect.topleft = (75, 298)
-
-        body_text_5 = self.HUD_font.render("To do this you will need to kill zombies and collect rubies.", True, GREEN)
-        body_text_5_rect = body_text_5.get_rect()
-        body_text_5_rect.topleft = (75, 346)
-
-        body_text_6 = self.HUD_font.render("To kill a zombie you will need to hit them with our slash attack (UP) Arrow.", True, GREEN)
-        body_text_6_rect = body_text_6.get_rect()
-        body_text_6_rect.topleft = (75, 394)
-
-        body_text_7 = self.HUD_font.render("Once a zombie is down you will need to stomp on them by running them over.", True, GREEN)
-        body_text_7_rect = body_text_7.get_rect()
-        body_text_7_rect.topleft = (75, 442)
+        #Start music again (after the game over screen if it is showing)
+        if self.pending_screens:
+            self.restart_music = True
+        else:
+            sound_bank.play_music()
 
-        body_text_8 = self.HUD_font.render("Collecting a Ruby will give you a score bonus and health.", True, GREEN)
-        body_text_8_rect = body_text_8.get_rect()
-        body_text_8_rect.topleft = (75, 490)
+class Tile(pygame.sprite.Sprite):
+    """A class to represent a 32x32 pixel area in our display"""
 
-        body_text_9 = self.HUD_font.render("If a zombie collects a Ruby another zombie will appear immediately!", True, GREEN)
-        body_text_9_rect = body_text_9.get_rect()
-        body_text_9_rect.topleft = (75, 538)
+    def __init__(self, x, y, image_int, platform_group):
+        """Initialize a platform tile (other tiles are only drawn into their chunk's surface)"""
+        super().__init__()
+        #Load in the correct image
+        self.image = asset_cache.load_frame(join('Assets', 'images', 'tiles', f'Tile ({image_int}).png'), (32, 32))
 
-        body_text_10 = self.HUD_font.render("Use the portals in the connors to move quickly around the screen.", True, GREEN)
-        body_text_10_rect = body_text_10.get_rect()
-        body_text_10_rect.topleft = (75, 586)
+        #Get the rect of the image and position with in the grid (before adding it to the grid indexed platform group)
+        self.rect = self.image.get_rect()
+        self.rect.topleft = (x, y)
 
-        body_text_11 = self.HUD_font.render("Try surviving as many nights as you can to get a huge high score.", True, GREEN)
-        body_text_11_rect = body_text_11.get_rect()
-        body_text_11_rect.topleft = (75, 634)
+        #Create mask for better collisions
+        self.mask = asset_cache.get_mask(self.image)
 
-        body_text_12 = self.HUD_font.render("GOOD LUCK SURVIVING THE NIGHT! Press ENTER to begin!", True, GREEN)
-        body_text_12_rect = body_text_12.get_rect()
-        body_text_12_rect.center = (WINDOW_WIDTH /2 , 700)
+        #Add it to the platform group
+        platform_group.add(self)
 
-        #Display pause text
-        display_surface.fill(BLACK)
-        display_surface.blit(title_text, title_rect)
-        pygame.draw.line(display_surface, WHITE, title_rect.bottomleft, title_rect.bottomright, 3)
-        display_surface.blit(body_text_1, body_text_1_rect)
-        display_surface.blit(body_text_2, body_text_2_rect)
-        display_surface.blit(body_text_3, body_text_3_rect)
-        display_surface.blit(title_text_2, title_rect_2)
-        pygame.draw.line(display_surface, WHITE, title_rect_2.bottomleft, title_rect_2.bottomright, 3)
-        display_surface.blit(body_text_4, body_text_4_rect)
-        display_surface.blit(body_text_5, body_text_5_rect)
-        display_surface.blit(body_text_6, body_text_6_rect)
-        display_surface.blit(body_text_7, body_text_7_rect)
-        display_surface.blit(body_text_8, body_text_8_rect)
-        display_surface.blit(body_text_9, body_text_9_rect)
-        display_surface.blit(body_text_10, body_text_10_rect)
-        display_surface.blit(body_text_11, body_text_11_rect)
-        display_surface.blit(body_text_12, body_text_12_rect)
-        
+class PlatformGroup(pygame.sprite.Group):
+    """A sprite group that also indexes its tiles by their cell in the tile grid"""
 
-        
-        pygame.display.update()
-
-        controls_page = True
-        while controls_page:
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
-                    #User wants to continue
-                    if event.key == pygame.K_RETURN:
-                        controls_page = False
-                #User wants to quit
-                if event.type == pygame.QUIT:
-                    sys.exit()
+    def __init__(self, tile_size):
+        """Initialize the platform group"""
+        super().__init__()
+        self.tile_size = tile_size
+
+        #Tiles stored by (row, column)
+        self.cells = {}
+
+    def get_cells(self, rect):
+        """Return every (row, column) a rect overlaps, top row first"""
+        first_column = rect.left // self.tile_size
+        last_column = (rect.right - 1) // self.tile_size
+        first_row = rect.top // self.tile_size
+        last_row = (rect.bottom - 1) // self.tile_size
+        return [(row, column) for row in range(first_row, last_row + 1) for column in range(first_column, last_column + 1)]
+
+    def add_internal(self, sprite, layer=None):
+        """Add a tile to the group and to every cell it covers"""
+        super().add_internal(sprite, layer)
+        for cell in self.get_cells(sprite.rect):
+            self.cells.setdefault(cell, []).append(sprite)
+
+    def remove_internal(self, sprite):
+        """Remove a tile from the group and its cells"""
+        super().remove_internal(sprite)
+        for cell in self.get_cells(sprite.rect):
+            self.cells[cell].remove(sprite)
+
+    def collide(self, sprite, collided=None):
+        """Return the tiles a sprite collides with (like spritecollide) by only checking nearby cells"""
+        tiles = []
+        for cell in self.get_cells(sprite.rect):
+            for tile in self.cells.get(cell, ()):
+                if tile not in tiles:
+                    tiles.append(tile)
+
+        if collided is None:
+            return [tile for tile in tiles if sprite.rect.colliderect(tile.rect)]
+        return [tile for tile in tiles if collided(sprite, tile)]
+
+class ChunkedMap():
+    """A class to store a tile map as square chunks of tiles"""
+
+    def __init__(self, level_map, tile_size, chunk_size):
+        """Split a tile map (a list of rows) into chunks"""
+        self.tile_size = tile_size
+        self.chunk_size = chunk_size
+
+        #Size of the level in tiles and pixels
+        self.rows = len(level_map)
+        self.columns = len(level_map[0])
+        self.width = self.columns * tile_size
+        self.height = self.rows * tile_size
+
+        #Chunks stored by (chunk row, chunk column) (chunks with no tiles at all are not stored)
+        self.chunks = {}
+        cells = np.array(level_map, dtype=np.uint8)
+        for top in range(0, self.rows, chunk_size):
+            for left in range(0, self.columns, chunk_size):
+                chunk = cells[top:top + chunk_size, left:left + chunk_size]
+                if chunk.any():
+                    self.chunks[(top // chunk_size, left // chunk_size)] = chunk.copy()
+
+        #Platform cells, with an empty border so anything off the map never touches a platform
+        self.platforms = np.zeros((self.rows + 2, self.columns + 2), dtype=bool)
+        self.platforms[1:-1, 1:-1] = np.isin(cells, (2, 3, 4, 5))
+        self.platform_rows = self.platforms.tolist()
+
+        #Bottom left of every ruby maker (whether its chunk is loaded or not), where rubies are dropped from
+        self.ruby_makers = [(int(column) * tile_size, int(row) * tile_size) for row, column in np.argwhere(cells == 6)]
+
+    def get_cells(self):
+        """Return the whole map as an array of tile numbers"""
+        cells = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        for (chunk_row, chunk_column), chunk in self.chunks.items():
+            top = chunk_row * self.chunk_size
+            left = chunk_column * self.chunk_size
+            cells[top:top + chunk.shape[0], left:left + chunk.shape[1]] = chunk
+        return cells
+
+    def get_chunk_rect(self, key):
+        """Return the area of the level a chunk covers"""
+        chunk_row, chunk_column = key
+        chunk = self.chunks[key]
+        chunk_pixels = self.chunk_size * self.tile_size
+        return pygame.Rect(chunk_column * chunk_pixels, chunk_row * chunk_pixels, chunk.shape[1] * self.tile_size, chunk.shape[0] * self.tile_size)
+
+    def get_chunks_in(self, rect):
+        """Return the keys of the stored chunks that overlap a rect"""
+        chunk_pixels = self.chunk_size * self.tile_size
+        keys = []
+        for chunk_row in range(max(rect.top // chunk_pixels, 0), (rect.bottom - 1) // chunk_pixels + 1):
+            for chunk_column in range(max(rect.left // chunk_pixels, 0), (rect.right - 1) // chunk_pixels + 1):
+                if (chunk_row, chunk_column) in self.chunks:
+                    keys.append((chunk_row, chunk_column))
+        return keys
+
+    def sweep(self, start, end, width, offset):
+        """Sweep the horizontal edges of boxes (left x, edge y) from start to end against the platforms.
+        An edge stops on the line offset pixels below the top of each platform row it crosses.
+        Returns (hit, time, y) arrays: which edges stopped, when (0 to 1 of the move) and where"""
+        start_x, start_y = start[:, 0], start[:, 1]
+        end_x, end_y = end[:, 0], end[:, 1]
+        direction = np.where(end_y < start_y, -1, 1)
+
+        #Index of the first and last platform row line each edge crosses, in the direction it moves
+        start_line = (start_y - offset) / self.tile_size
+        end_line = (end_y - offset) / self.tile_size
+        first_row = np.where(direction > 0, np.ceil(start_line), np.floor(start_line)).astype(int)
+        last_row = np.where(direction > 0, np.floor(end_line), np.ceil(end_line)).astype(int)
+        row_count = (last_row - first_row) * direction + 1
+
+        hit = np.zeros(len(start), dtype=bool)
+        time = np.ones(len(start))
+        y = end_y.copy()
+        if len(start) == 0 or row_count.max() <= 0:
+            return hit, time, y
+
+        #Check each crossed line in order, at the x the edge is at when it reaches the line
+        rows, columns = self.platforms.shape
+        distance = np.where(end_y == start_y, 1, end_y - start_y)
+        column_offsets = np.arange(int(np.max(width)) // self.tile_size + 2)
+        for i in range(row_count.max()):
+            row = first_row + i * direction
+            line = row * self.tile_size + offset
+            line_time = np.clip((line - start_y) / distance, 0, 1)
+            left = start_x + (end_x - start_x) * line_time
+            first_column = np.floor(left / self.tile_size).astype(int)
+            last_column = np.floor((left + width - 1) / self.tile_size).astype(int)
+
+            column = first_column[:, None] + column_offsets
+            cells = self.platforms[np.clip(row + 1, 0, rows - 1)[:, None], np.clip(column + 1, 0, columns - 1)]
+            landed = (cells & (column <= last_column[:, None])).any(axis=1) & (i < row_count) & ~hit
+
+            hit |= landed
+            time[landed] = line_time[landed]
+            y[landed] = line[landed]
+
+        return hit, time, y
+
+    def sweep_box(self, start_x, start_y, end_x, end_y, width, offset):
+        """sweep() for a single edge in plain Python (numpy's overhead is most of the cost for one box). Returns (hit, time, y)"""
+        if end_y < start_y:
+            rows = range(math.floor((start_y - offset) / self.tile_size), math.ceil((end_y - offset) / self.tile_size) - 1, -1)
+        else:
+            rows = range(math.ceil((start_y - offset) / self.tile_size), math.floor((end_y - offset) / self.tile_size) + 1)
+
+        distance = end_y - start_y or 1
+        last_row = len(self.platform_rows) - 1
+        last_column = len(self.platform_rows[0]) - 1
+        for row in rows:
+            line = row * self.tile_size + offset
+            line_time = min(max((line - start_y) / distance, 0), 1)
+            left = start_x + (end_x - start_x) * line_time
+            cells = self.platform_rows[min(max(row + 1, 0), last_row)]
+            for column in range(math.floor(left / self.tile_size), math.floor((left + width - 1) / self.tile_size) + 1):
+                if cells[min(max(column + 1, 0), last_column)]:
+                    return True, line_time, line
+
+        return False, 1, end_y
+
+class Camera():
+    """A class to follow the player around a level that is bigger than the window"""
+
+    def __init__(self, level):
+        """Initialize the camera"""
+        self.level = level
+
+        #Top left of the view now and before the last step
+        self.x = 0
+        self.y = 0
+        self.previous_x = 0
+        self.previous_y = 0
+
+    def follow(self, rect, snap=False):
+        """Center the view on a rect without showing past the edges of the level"""
+        self.previous_x = self.x
+        self.previous_y = self.y
+        self.x = min(max(rect.centerx - WINDOW_WIDTH // 2, 0), max(self.level.width - WINDOW_WIDTH, 0))
+        self.y = min(max(rect.centery - WINDOW_HEIGHT // 2, 0), max(self.level.height - WINDOW_HEIGHT, 0))
+        if snap:
+            self.previous_x = self.x
+            self.previous_y = self.y
+
+    def get_offset(self, alpha):
+        """Return the top left of the view alpha of the way from where it was before the last step"""
+        #Don't slide across the level when the player wraps around or uses a portal
+        if abs(self.x - self.previous_x) > MAX_INTERPOLATION_DISTANCE or abs(self.y - self.previous_y) > MAX_INTERPOLATION_DISTANCE:
+            alpha = 1
+        return (round(self.previous_x + (self.x - self.previous_x) * alpha), round(self.previous_y + (self.y - self.previous_y) * alpha))
+
+    def get_view(self, margin):
+        """Return the area of the level in view, grown by margin on every side"""
+        return pygame.Rect(self.x - margin, self.y - margin, WINDOW_WIDTH + 2 * margin, WINDOW_HEIGHT + 2 * margin)
+
+class ChunkLoader():
+    """A class to load the chunks near the camera and release the ones far from it"""
+
+    def __init__(self, level, camera, main_tile_group, platform_group, render):
+        """Initialize the chunk loader. Chunks only get a pre-rendered surface when the game is drawn"""
+        self.level = level
+        self.camera = camera
+        self.main_tile_group = main_tile_group
+        self.platform_group = platform_group
+        self.render = render
 
-class Tile(pygame.sprite.Sprite):
-    """A class to represent a 32x32 pixel area in our display"""
+        #Loaded chunks stored by key as [surface, sprites]
+        self.loaded = {}
 
-    def __init__(self, x, y, image_int, main_group, sub_group=""):
-        """Initialize the tile"""
-        super().__init__()
-        #Load in the correct image and add it to the correct sub group
-        #Dirt Tiles
-        if image_int == 1:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'tiles', 'Tile (1).png')), (32, 32))
-        #Platform Tiles
-        elif image_int == 2:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'tiles', 'Tile (2).png')), (32, 32))
-            sub_group.add(self)
-        elif image_int == 3:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'tiles', 'Tile (3).png')), (32, 32))
-            sub_group.add(self)
-        elif image_int == 4:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'tiles', 'Tile (4).png')), (32, 32))
-            sub_group.add(self)
-        elif image_int == 5:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'tiles', 'Tile (5).png')), (32, 32))
-            sub_group.add(self)
-
-        #Add every tile to the main group
-        main_group.add(self)
+        #Changes every time a chunk is loaded or released
+        self.version = 0
+        self.loads = 0
+        self.releases = 0
 
-        #Get the rect of the image and position with in the grid
-        self.rect = self.image.get_rect()
-        self.rect.topleft = (x, y)
+        #Where the camera was the last time chunks were checked
+        self.camera_position = None
 
-        #Create mask for better collisions
-        self.mask = pygame.mask.from_surface(self.image)
+    def update(self):
+        """Load the chunks near the view and release the ones that are far away"""
+        #Nothing changes while the camera stands still
+        if (self.camera.x, self.camera.y) == self.camera_position:
+            return
+        self.camera_position = (self.camera.x, self.camera.y)
+
+        for key in self.level.get_chunks_in(self.camera.get_view(CHUNK_LOAD_MARGIN)):
+            if key not in self.loaded:
+                self.load(key)
+
+        #Chunks between the two margins stay as they are so walking back and forth doesn't reload them
+        keep = set(self.level.get_chunks_in(self.camera.get_view(CHUNK_RELEASE_MARGIN)))
+        for key in [key for key in self.loaded if key not in keep]:
+            self.release(key)
+
+    def load(self, key):
+        """Make the sprites for a chunk's platforms and ruby makers and draw its tiles into one surface"""
+        chunk = self.level.chunks[key]
+        rect = self.level.get_chunk_rect(key)
+        tile_size = self.level.tile_size
+
+        surface = pygame.Surface(rect.size, pygame.SRCALPHA).convert_alpha() if self.render else None
+        sprites = []
+        for (row, column), image_int in np.ndenumerate(chunk):
+            x = rect.x + column * tile_size
+            y = rect.y + row * tile_size
+            #Dirt and platform tiles
+            if image_int in (1, 2, 3, 4, 5):
+                if surface:
+                    surface.blit(asset_cache.load_frame(join('Assets', 'images', 'tiles', f'Tile ({image_int}).png'), (32, 32)), (x - rect.x, y - rect.y))
+                if image_int != 1:
+                    sprites.append(Tile(x, y, image_int, self.platform_group))
+            #Ruby Maker
+            elif image_int == 6:
+                sprites.append(RubyMaker(x, y, self.main_tile_group))
+
+        #Chunks are mostly empty, so run-length encoding makes drawing them much faster
+        if surface:
+            surface.set_alpha(255, pygame.RLEACCEL)
+
+        self.loaded[key] = [surface, sprites]
+        self.version += 1
+        self.loads += 1
+
+    def release(self, key):
+        """Remove a chunk's sprites and forget its surface"""
+        surface, sprites = self.loaded.pop(key)
+        for sprite in sprites:
+            sprite.kill()
+        self.version += 1
+        self.releases += 1
+
+class LevelRenderer():
+    """A class to draw the background and the loaded chunks in view, from one cached surface while the camera stands still"""
+
+    def __init__(self, background_image, chunk_loader):
+        """Initialize the level renderer"""
+        self.background_image = background_image
+        self.chunk_loader = chunk_loader
+
+        #The cached level, where the camera was when it was built and the animated tiles (like the ruby maker) drawn on top of it
+        self.level_surface = None
+        self.level_offset = None
+        self.offset = (0, 0)
+        self.animated_sprites = []
+        self.signature = None
+
+        #Where the camera was and which chunks were loaded the last time the level was drawn
+        self.drawn = None
+
+        #Size the level is drawn at, with the background, chunk surfaces and animated tile frames shrunk to it.
+        #Shrunk backgrounds are stored by scale and shrunk chunks by (key, scale) as (surface, shrunk surface), and both are kept when the scale changes
+        self.scale = 1
+        self.scaled_background = background_image
+        self.scaled_backgrounds = {1: background_image}
+        self.scaled_chunks = {}
+        self.scaled_frames = None
+
+        #Chunk loader version the shrunk chunks were last checked against
+        self.scaled_version = None
+
+    def set_scale(self, scale):
+        """Draw the level at a different size from the next frame on"""
+        if scale != self.scale:
+            self.scale = scale
+            if scale not in self.scaled_backgrounds:
+                self.scaled_backgrounds[scale] = pygame.transform.scale(self.background_image, (round(WINDOW_WIDTH * scale), round(WINDOW_HEIGHT * scale)))
+            self.scaled_background = self.scaled_backgrounds[scale]
+            self.scaled_frames = None if scale == 1 else asset_cache.get_scaled_frames(scale)
+            self.level_surface = None
+            self.signature = None
+            self.drawn = None
+
+    def get_chunk_surface(self, key, surface):
+        """Return a chunk's surface at the size the level is drawn at"""
+        if self.scale == 1:
+            return surface
+        scaled_key = (key, self.scale)
+        if scaled_key not in self.scaled_chunks or self.scaled_chunks[scaled_key][0] is not surface:
+            width, height = surface.get_size()
+            scaled = pygame.transform.scale(surface, (round(width * self.scale), round(height * self.scale)))
+            scaled.set_alpha(255, pygame.RLEACCEL)
+            self.scaled_chunks[scaled_key] = (surface, scaled)
+        return self.scaled_chunks[scaled_key][1]
+
+    def get_signature(self):
+        """Return a value that changes whenever chunks are loaded or released"""
+        return self.chunk_loader.version
+
+    def is_cached(self):
+        """True when the cached level shows the view as it is now"""
+        return self.level_surface is not None and self.level_offset == self.offset and self.signature == self.get_signature()
+
+    def draw_level(self, surface):
+        """Draw the background and every chunk in view straight onto a surface"""
+        surface.blit(self.scaled_background, (0, 0))
+        offset_x, offset_y = self.offset
+        scale = self.scale
+        screen_rect = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        for key, (chunk_surface, sprites) in self.chunk_loader.loaded.items():
+            rect = self.chunk_loader.level.get_chunk_rect(key).move(-offset_x, -offset_y)
+            if chunk_surface and rect.colliderect(screen_rect):
+                surface.blit(self.get_chunk_surface(key, chunk_surface), (round(rect.x * scale), round(rect.y * scale)))
+
+        #Forget shrunk chunks that were released (only checked when chunks were loaded or released)
+        if self.scaled_chunks and self.scaled_version != self.chunk_loader.version:
+            self.scaled_chunks = {key: value for key, value in self.scaled_chunks.items() if key[0] in self.chunk_loader.loaded}
+            self.scaled_version = self.chunk_loader.version
+
+        #Only animated tiles in view are drawn (the ones out of view just keep counting time)
+        view_rect = screen_rect.move(offset_x, offset_y)
+        self.animated_sprites = [sprite for sprite in self.chunk_loader.main_tile_group if sprite.rect.colliderect(view_rect)]
+
+    def build(self):
+        """Composite the background and every chunk in view into the cached level"""
+        if self.level_surface is None:
+            self.level_surface = self.scaled_background.copy()
+        self.draw_level(self.level_surface)
+        self.level_offset = self.offset
+        self.signature = self.get_signature()
+
+    def check_rebuild(self):
+        """True if the view moved or chunks were loaded or released since the level was last drawn (so all of it has to be drawn again)"""
+        return self.drawn != (self.offset, self.get_signature())
+
+    def restore(self, surface, rect):
+        """Draw the cached level over one area of the screen"""
+        if not self.is_cached():
+            self.build()
+        surface.blit(self.level_surface, rect, rect)
+
+    def draw_animated(self, surface):
+        """Draw the animated tiles in view, working out their frames first. Returns the areas drawn"""
+        offset_x, offset_y = self.offset
+        for sprite in self.animated_sprites:
+            sprite.update_frame()
+        if self.scale != 1:
+            scale = self.scale
+            scaled_frames = self.scaled_frames
+            return [surface.blit(scaled_frames[sprite.image], ((sprite.rect.x - offset_x) * scale, (sprite.rect.y - offset_y) * scale))
+                    for sprite in self.animated_sprites]
+        return [surface.blit(sprite.image, sprite.rect.move(-offset_x, -offset_y)) for sprite in self.animated_sprites]
+
+    def draw(self, surface):
+        """Draw the level and animated tiles. Returns the areas of the animated tiles.
+        While the camera moves the chunks are drawn straight onto the surface, and once it stands still the level is cached"""
+        drawn = (self.offset, self.get_signature())
+        if not self.is_cached() and drawn == self.drawn:
+            self.build()
+        if self.is_cached():
+            surface.blit(self.level_surface, (0, 0))
+        else:
+            self.draw_level(surface)
+        self.drawn = drawn
+        return self.draw_animated(surface)
+
+class Renderer():
+    """A class to draw each frame, optionally only updating the parts of the screen that changed"""
+
+    def __init__(self, level_renderer, use_dirty_rects, max_dirty_fraction):
+        """Initialize the renderer"""
+        self.level_renderer = level_renderer
+        self.use_dirty_rects = use_dirty_rects
+
+        #Fall back to a full screen update when more than this much of the screen changed
+        self.max_dirty_area = WINDOW_WIDTH * WINDOW_HEIGHT * max_dirty_fraction
+
+        #Areas drawn last frame and this frame
+        self.previous_rects = []
+        self.current_rects = []
+
+        #Redraw everything on the first frame and after the screen was drawn over
+        self.full_redraw = True
+        self.full_update = True
+
+        #Size the world is drawn at (below 1 the whole scene is scaled up to the window every frame) and the sprite frames shrunk to it
+        self.scale = 1
+        self.scaled_frames = None
+
+    def set_scale(self, scale):
+        """Draw the world at a different size from the next frame on"""
+        if scale != self.scale:
+            self.scale = scale
+            self.scaled_frames = None if scale == 1 else asset_cache.get_scaled_frames(scale)
+            self.level_renderer.set_scale(scale)
+            self.invalidate()
+
+    def invalidate(self):
+        """Redraw and update the whole screen next frame"""
+        self.full_redraw = True
+
+    def clear(self, surface, offset):
+        """Start a frame by drawing the level (seen from offset) behind everything that moved"""
+        self.full_update = self.full_redraw or not self.use_dirty_rects or self.scale != 1
+        self.full_redraw = False
+        self.level_renderer.offset = offset
+
+        if self.level_renderer.check_rebuild() or self.full_update:
+            self.full_update = True
+            self.current_rects = self.level_renderer.draw(surface)
+        else:
+            #Only restore what was drawn over last frame
+            for rect in self.previous_rects:
+                self.level_renderer.restore(surface, rect)
+            self.current_rects = self.level_renderer.draw_animated(surface)
+
+    def draw_group(self, surface, group, previous_positions, alpha, offset):
+        """Draw a sprite group alpha of the way from each sprite's previous position to its current one.
+        Sprites outside the view (whose top left is at offset) are skipped"""
+        offset_x, offset_y = offset
+        blits = []
+        for sprite in group:
+            x, y = sprite.rect.topleft
+            if sprite in previous_positions:
+                previous_x, previous_y = previous_positions[sprite]
+                if abs(x - previous_x) <= MAX_INTERPOLATION_DISTANCE and abs(y - previous_y) <= MAX_INTERPOLATION_DISTANCE:
+                    x = previous_x + (x - previous_x) * alpha
+                    y = previous_y + (y - previous_y) * alpha
+
+            x -= offset_x
+            y -= offset_y
+            if x < WINDOW_WIDTH and y < WINDOW_HEIGHT and x + sprite.rect.width > 0 and y + sprite.rect.height > 0:
+                blits.append((sprite.image, (x, y)))
+
+        #Shrink the sprites (and where they go) to the size the world is drawn at
+        if self.scale != 1:
+            scale = self.scale
+            scaled_frames = self.scaled_frames
+            blits = [(scaled_frames[image], (x * scale, y * scale)) for image, (x, y) in blits]
+
+        rects = surface.blits(blits)
+        if self.use_dirty_rects:
+            self.current_rects.extend(rects)
+
+    def add_rects(self, rects):
+        """Remember areas drawn outside of a sprite group (like the HUD)"""
+        self.current_rects.extend(rects)
+
+    def update_display(self):
+        """Update the changed areas of the display (or all of it)"""
+        if self.full_update:
+            pygame.display.update()
+        else:
+            #Areas that were drawn this frame and areas that need to be erased from last frame
+            dirty_rects = self.previous_rects + self.current_rects
+            if sum(rect.width * rect.height for rect in dirty_rects) > self.max_dirty_area:
+                pygame.display.update()
+            else:
+                pygame.display.update(dirty_rects)
+
+        self.previous_rects = self.current_rects
+        self.current_rects = []
+
+class FrameTimeGovernor():
+    """A class to step through levels (most expensive first) from how long frames take"""
+
+    def __init__(self, levels, frame_budget, settle_frames):
+        """Initialize the governor. It waits settle_frames between changes so one slow frame doesn't change the level"""
+        self.levels = levels
+        self.frame_budget = frame_budget
+        self.settle_frames = settle_frames
+
+        #Index of the current level, smoothed frame time and frames since the last change
+        self.index = 0
+        self.average = 0
+        self.frames = 0
+
+        #Lowest level worth dropping to (a level that turned out no faster than the one above it is never used again),
+        #and the smoothed frame time just before the last drop (None once the drop has been measured)
+        self.lowest = len(levels) - 1
+        self.average_before_drop = None
+
+    def get_level(self):
+        """Return the current level"""
+        return self.levels[self.index]
+
+    def is_lowest(self):
+        """True when there is no cheaper level to drop to"""
+        return self.index >= self.lowest
+
+    def get_raise_cost(self):
+        """Return how many times longer frames are expected to take one level up"""
+        return 1
+
+    def update(self, frame_time):
+        """Add the time a frame took (without waiting for the clock) and return the level to use"""
+        self.average += (frame_time - self.average) * .1
+        self.frames += 1
+        if self.frames < self.settle_frames:
+            return self.get_level()
+
+        #Measure the last drop: if frames didn't get any faster go back up and stop there
+        if self.average_before_drop is not None:
+            made_slower = self.average >= self.average_before_drop
+            self.average_before_drop = None
+            if made_slower:
+                self.index -= 1
+                self.lowest = self.index
+                self.frames = 0
+                return self.get_level()
+
+        #Drop a level when over budget, and only go back up when the level above should still fit with some to spare
+        if self.average > self.frame_budget and not self.is_lowest():
+            self.average_before_drop = self.average
+            self.index += 1
+            self.frames = 0
+        elif self.index > 0 and self.average * self.get_raise_cost() < self.frame_budget * .8:
+            self.index -= 1
+            self.frames = 0
+        return self.get_level()
+
+class ResolutionGovernor(FrameTimeGovernor):
+    """A class to pick the size the world is drawn at from how long frames take"""
+
+    def get_raise_cost(self):
+        """Return how many times more pixels the next size up has to fill"""
+        return (self.levels[self.index - 1] / self.levels[self.index])**2
+
+class DetailLevel():
+    """A class to hold how often decorative and far away animations work out their frame (lowered by a quality governor)"""
+
+    def __init__(self, far_distance):
+        """Initialize the level of detail (full detail until a tier is set)"""
+        self.far_distance = far_distance
+        self.tier = 0
+        self.decoration_steps = 1
+        self.far_steps = 1
+
+        #Where the player is
+        self.focus_x = 0
+        self.focus_y = 0
+
+    def set_tier(self, tier):
+        """Use one of DETAIL_TIERS"""
+        self.tier = tier
+        self.decoration_steps, self.far_steps = DETAIL_TIERS[tier]
+
+    def get_steps(self, rect):
+        """Return how many steps apart a sprite at rect works out its animation frame"""
+        if self.far_steps > 1 and (abs(rect.centerx - self.focus_x) > self.far_distance or abs(rect.centery - self.focus_y) > self.far_distance):
+            return self.far_steps
+        return 1
+
+class FrameProfiler():
+    """A class to time each phase of recent frames, graph them on screen and stream them to a CSV file"""
+
+    def __init__(self, history_size):
+        """Initialize the profiler (it does nothing until it is enabled)"""
+        self.enabled = False
+        self.show_overlay = False
+
+        #Ring buffer of the last history_size frames (seconds spent in each phase)
+        self.history = np.zeros((history_size, len(PROFILE_PHASES)))
+        self.frame_count = 0
+        self.phase_times = [0.0] * len(PROFILE_PHASES)
+        self.phase_indexes = {phase: i for i, phase in enumerate(PROFILE_PHASES)}
+        self.last_time = 0
+
+        #Frame time graph (one column per frame, 4 pixels per millisecond) with a line at the frame budget.
+        #The graph and its font are only made the first time the overlay is shown (engines stepped in bulk never show it)
+        self.GRAPH_HEIGHT = 100
+        self.PIXELS_PER_MS = 4
+        self.graph = None
+        self.font = None
+        self.legend = None
+
+        #Extra line shown under the legend (like the level of detail)
+        self.status = ""
+
+        #Optional CSV file that every frame is written to
+        self.csv_file = None
+        self.csv_writer = None
+
+    def update_enabled(self):
+        """Only time frames while someone is looking at them"""
+        was_enabled = self.enabled
+        self.enabled = self.show_overlay or self.csv_writer is not None
+
+        #Turned on part way through a frame: time the rest of it from now rather than from whenever the profiler was last on
+        if self.enabled and not was_enabled:
+            self.phase_times = [0.0] * len(PROFILE_PHASES)
+            self.last_time = time.perf_counter()
+
+    def toggle_overlay(self):
+        """Show or hide the frame time graph"""
+        self.show_overlay = not self.show_overlay
+        if self.show_overlay and self.graph is None:
+            self.graph = pygame.Surface((len(self.history), self.GRAPH_HEIGHT))
+            self.graph.fill((0, 0, 0))
+            self.font = pygame.font.Font(join('Assets', 'fonts', 'Pixel.ttf'), 12)
+        self.update_enabled()
+
+    def open_csv(self, path):
+        """Write the phase times of every frame to a CSV file (line buffered, so a crash or kill keeps every frame written so far)"""
+        self.csv_file = open(path, 'w', newline='', buffering=1)
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_writer.writerow(('frame',) + tuple(f"{phase}_ms" for phase in PROFILE_PHASES) + ('total_ms',))
+        self.update_enabled()
+
+    def close_csv(self):
+        """Stop writing to the CSV file"""
+        if self.csv_file:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
+            self.update_enabled()
+
+    def start_frame(self):
+        """Start timing a frame"""
+        if self.enabled:
+            self.phase_times = [0.0] * len(PROFILE_PHASES)
+            self.last_time = time.perf_counter()
+
+    def mark(self, phase):
+        """Add the time since the last mark to a phase"""
+        if self.enabled:
+            current_time = time.perf_counter()
+            self.phase_times[self.phase_indexes[phase]] += current_time - self.last_time
+            self.last_time = current_time
+
+    def end_frame(self):
+        """Store the frame in the ring buffer, the graph and the CSV file"""
+        if not self.enabled:
+            return
+
+        self.history[self.frame_count % len(self.history)] = self.phase_times
+        self.frame_count += 1
+
+        if self.csv_writer:
+            times = [f"{phase_time * 1000:.3f}" for phase_time in self.phase_times]
+            self.csv_writer.writerow([self.frame_count] + times + [f"{sum(self.phase_times) * 1000:.3f}"])
+
+        if self.show_overlay:
+            #Scroll the graph left and stack this frame's phases in the new column
+            self.graph.scroll(-1, 0)
+            x = self.graph.get_width() - 1
+            pygame.draw.line(self.graph, (0, 0, 0), (x, 0), (x, self.GRAPH_HEIGHT))
+            y = self.GRAPH_HEIGHT
+            for phase_time, color in zip(self.phase_times, PROFILE_COLORS):
+                height = phase_time * 1000 * self.PIXELS_PER_MS
+                if height >= 1:
+                    pygame.draw.line(self.graph, color, (x, y), (x, y - height + 1))
+                y -= height
+            budget_y = self.GRAPH_HEIGHT - 1000 / FPS * self.PIXELS_PER_MS
+            self.graph.set_at((x, int(budget_y)), (255, 255, 255))
+
+            #The legend only changes twice a second so its text isn't rendered every frame
+            if self.legend is None or self.frame_count % (FPS // 2) == 0:
+                self.legend = self.render_legend()
+
+    def get_averages(self):
+        """Return the average milliseconds of each phase over the recorded frames"""
+        frames = self.history[:min(self.frame_count, len(self.history))]
+        if len(frames) == 0:
+            return dict.fromkeys(PROFILE_PHASES, 0.0)
+        return dict(zip(PROFILE_PHASES, (frames.mean(axis=0) * 1000).tolist()))
+
+    def render_legend(self):
+        """Render the average time of each phase in its graph color"""
+        lines = [self.font.render(f"{phase} {average:.2f}ms", True, color)
+                 for (phase, average), color in zip(self.get_averages().items(), PROFILE_COLORS)]
+        if self.status:
+            lines.append(self.font.render(self.status, True, (255, 255, 255)))
+        legend = pygame.Surface((max(line.get_width() for line in lines), sum(line.get_height() for line in lines)))
+        y = 0
+        for line in lines:
+            legend.blit(line, (0, y))
+            y += line.get_height()
+        return legend
+
+    def draw(self, surface):
+        """Draw the graph and legend under the top left platform. Returns the area drawn"""
+        graph_rect = self.graph.get_rect(topleft=(10, 130))
+        rect = surface.blit(self.graph, graph_rect)
+        if self.legend:
+            rect = rect.union(surface.blit(self.legend, (graph_rect.right + 4, graph_rect.top)))
+        return rect
 
 class Player(pygame.sprite.Sprite):
     """A class the user can control"""
 
-    def __init__(self, x, y, platform_group, portal_group, bullet_group):
+    def __init__(self, x, y, platform_group, portal_group, bullet_pool, level):
         """Initialize the player"""
         super().__init__()
 
@@ -431,116 +1686,73 @@ class Player(pygame.sprite.Sprite):
         self.VERTICAL_ACCELERATION = 0.8  #Gravity
         self.VERTICAL_JUMP_SPEED = 18  #Determines how high the player can jump
         self.STARTING_HEALTH = 100
-
-        #Animation Frames
-        self.move_right_sprites = []
-        self.move_left_sprites = []
-        self.idle_right_sprites = []
-        self.idle_left_sprites = []
-        self.jump_right_sprites = []
-        self.jump_left_sprites = []
-        self.attack_right_sprites = []
-        self.attack_left_sprites = []
-
+        #Where the player's art is inside its 64x64 frames: feet/head box left edge and width, how far the feet
+        #sink into a platform and how far below the top of a platform tile the head bumps into it
+        self.BOX_LEFT = 16
+        self.BOX_WIDTH = 32
+        self.FOOT_SINK = 5
+        self.HEAD_BUMP = 20
+
+        #Animation clips (shared with every other player through the asset cache)
         #Moving
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (2).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (3).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (1).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (4).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (5).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (6).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (7).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (8).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (9).png')), (64, 64)))
-        self.move_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'run', 'Run (10).png')), (64, 64)))
-        for sprite in self.move_right_sprites:
-            self.move_left_sprites.append(pygame.transform.flip(sprite, True, False))
-
-        #Idling 
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (1).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (2).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (3).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (4).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (5).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (6).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (7).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (8).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (9).png')), (64, 64)))
-        self.idle_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'idle', 'Idle (10).png')), (64, 64)))
-        for sprite in self.idle_right_sprites:
-            self.idle_left_sprites.append(pygame.transform.flip(sprite, True, False))
+        run_paths = [join('Assets', 'images', 'player', 'run', f'Run ({i}).png') for i in (2, 3, 1, 4, 5, 6, 7, 8, 9, 10)]
+        self.move_right_clip = asset_cache.load_clip(run_paths, (64, 64), 30)
+        self.move_left_clip = asset_cache.load_clip(run_paths, (64, 64), 30, flip=True)
+
+        #Idling
+        idle_paths = [join('Assets', 'images', 'player', 'idle', f'Idle ({i}).png') for i in range(1, 11)]
+        self.idle_right_clip = asset_cache.load_clip(idle_paths, (64, 64), 15)
+        self.idle_left_clip = asset_cache.load_clip(idle_paths, (64, 64), 15, flip=True)
 
         #Jumping
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (1).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (2).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (3).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (4).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (5).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (6).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (7).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (8).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (9).png')), (64, 64)))
-        self.jump_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'jump', 'Jump (10).png')), (64, 64)))
-        for sprite in self.jump_right_sprites:
-            self.jump_left_sprites.append(pygame.transform.flip(sprite, True, False))
+        jump_paths = [join('Assets', 'images', 'player', 'jump', f'Jump ({i}).png') for i in range(1, 11)]
+        self.jump_right_clip = asset_cache.load_clip(jump_paths, (64, 64), 30, 'once')
+        self.jump_left_clip = asset_cache.load_clip(jump_paths, (64, 64), 30, 'once', True)
 
         #Attacking
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (1).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (2).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (3).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (4).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (5).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (6).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (7).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (8).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (9).png')), (64, 64)))
-        self.attack_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'attack', 'Attack (10).png')), (64, 64)))
-        for sprite in self.attack_right_sprites:
-            self.attack_left_sprites.append(pygame.transform.flip(sprite, True, False))
+        attack_paths = [join('Assets', 'images', 'player', 'attack', f'Attack ({i}).png') for i in range(1, 11)]
+        self.attack_right_clip = asset_cache.load_clip(attack_paths, (64, 64), 30, 'once')
+        self.attack_left_clip = asset_cache.load_clip(attack_paths, (64, 64), 30, 'once', True)
 
         #Load image and get rect
-        self.current_sprite = 0
-        self.image = self.idle_right_sprites[self.current_sprite]
+        self.animator = Animator(self.idle_right_clip)
+        self.move_clip = self.idle_right_clip
+        self.image = self.animator.image
+        self.mask = asset_cache.get_mask(self.image)
         self.rect = self.image.get_rect()
         self.rect.bottomleft = (x, y)
 
-        #Attach sprite group
+        #Attach sprite groups, the bullet pool and the level the player wraps around
         self.platform_group = platform_group
         self.portal_group = portal_group
-        self.bullet_group = bullet_group
+        self.bullet_pool = bullet_pool
+        self.level = level
 
         #Animation booleans
         self.animate_jump = False
         self.animate_fire = False
 
-        #Load Sounds and set Volumes
-        self.jump_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'jump_sound.wav'))
-        self.jump_sound.set_volume(.25)
-        self.slash_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'slash_sound.wav'))
-        self.slash_sound.set_volume(.25)
-        self.portal_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'portal_sound.wav'))
-        self.portal_sound.set_volume(.25)
-        self.hit_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'player_hit.wav'))
-        self.hit_sound.set_volume(.25)
-
         #Kinematics vectors
         self.position = vector(x, y)
         self.velocity = vector(0, 0)
         self.acceleration = vector(0, self.VERTICAL_ACCELERATION)
+        #Where the player was at the start of the last step
+        self.step_start = vector(x, y)
+
+        #Held movement keys (set each frame by the engine)
+        self.input_left = False
+        self.input_right = False
 
         #Set initial player values
         self.health = self.STARTING_HEALTH
         self.starting_x = x
         self.starting_y = y
 
-    def update(self):
+    def update(self, dt):
         """Update the player"""
         self.move()
         self.check_collisions()
-        self.check_animations()
-
-        #Update the players mask
-        self.mask = pygame.mask.from_surface(self.image)
+        self.check_animations(dt)
 
     def move(self):
         """Move the player"""
@@ -548,144 +1760,239 @@ class Player(pygame.sprite.Sprite):
         self.acceleration = vector(0, self.VERTICAL_ACCELERATION)
 
         #If user is pressing a key, set the x-component of the acceleration to be non-zero
-        keys =  pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]:
+        if self.input_left:
             self.acceleration.x = -1*self.HORIZONTAL_ACCELERATION
-            self.animate(self.move_left_sprites, 0.5)
-        elif keys[pygame.K_RIGHT]:
+            self.move_clip = self.move_left_clip
+        elif self.input_right:
             self.acceleration.x = self.HORIZONTAL_ACCELERATION
-            self.animate(self.move_right_sprites, 0.5)
+            self.move_clip = self.move_right_clip
         else:
             if self.velocity.x > 0:
-                self.animate(self.idle_right_sprites, .25)
+                self.move_clip = self.idle_right_clip
             else:
-                self.animate(self.idle_left_sprites, .25)
+                self.move_clip = self.idle_left_clip
 
         #Calculate new kinematics values: (4, 1) + (2, 8) = (6, 9)
         self.acceleration.x -= self.velocity.x * self.HORIZONTAL_FRICTION
         self.velocity += self.acceleration
+        self.step_start = vector(self.position)
         self.position += self.velocity + 0.5*self.acceleration
 
-        #Update rect based on kinematics and wrap around movement
+        #Update rect based on kinematics and wrap around movement (a wrapped step is swept straight down at its new x)
         if self.position.x < 0:
-            self.position.x = WINDOW_WIDTH
-        elif self.position.x > WINDOW_WIDTH:
+            self.position.x = self.level.width
+            self.step_start.x = self.position.x
+        elif self.position.x > self.level.width:
             self.position.x = 0
+            self.step_start.x = self.position.x
 
         self.rect.bottomleft = self.position
 
     def check_collisions(self):
         """Check for collisions with platforms and portals"""
-        #Collision check between player and platforms when falling
+        #Sweep the feet down to the first platform reached this step when falling
         if self.velocity.y > 0:
-            collided_platforms = pygame.sprite.spritecollide(self, self.platform_group, False, pygame.sprite.collide_mask)
-            if collided_platforms:
-                self.position.y = collided_platforms[0].rect.top +5
-                self.velocity.y = 0 
-
-        #Collision check between player and platform if jumping up
-        if self.velocity.y < 0:
-            collided_platforms = pygame.sprite.spritecollide(self, self.platform_group, False, pygame.sprite.collide_mask)
-            if collided_platforms:
+            hit, y = self.sweep(0, self.FOOT_SINK)
+            if hit:
+                self.position.y = y
+                self.velocity.y = 0
+                self.rect.bottomleft = self.position
+
+        #Sweep the head up to the first platform reached this step when jumping and drop below it
+        elif self.velocity.y < 0:
+            hit, y = self.sweep(-self.rect.height, self.HEAD_BUMP)
+            if hit:
+                self.position.y = y - self.HEAD_BUMP + self.level.tile_size + self.rect.height
                 self.velocity.y = 0
-                while pygame.sprite.spritecollide(self, self.platform_group, False):
-                    self.position.y += 1
-                    self.rect.bottomleft = self.position
+                self.rect.bottomleft = self.position
 
         #Collision check for portals
         if pygame.sprite.spritecollide(self, self.portal_group, False):
-            self.portal_sound.play()
+            sound_bank.play('portal', 3)
             #Determine which portal you are moving to
             #Left and right
-            if self.position.x > WINDOW_WIDTH / 2:
+            if self.position.x > self.level.width / 2:
                 self.position.x = 86
             else:
-                self.position.x = WINDOW_WIDTH - 150
+                self.position.x = self.level.width - 150
             #Top and Bottom
-            if self.position.y > WINDOW_HEIGHT / 2:
+            if self.position.y > self.level.height / 2:
                 self.position.y = 64
             else:
-                self.position.y = WINDOW_HEIGHT - 132
+                self.position.y = self.level.height - 132
 
             self.rect.bottomleft = self.position
 
-    def check_animations(self):
-        """Check to see if jump or fire animations should run"""
-        #Animate the player jump
-        if self.animate_jump:
-            if self.velocity.x > 0:
-                self.animate(self.jump_right_sprites, .1)
-            else:
-                self.animate(self.jump_left_sprites, .1)
+    def sweep(self, edge, offset):
+        """Sweep a horizontal edge of the player (edge pixels below the position) through this step.
+        Returns (hit, y) where y is where the edge stopped"""
+        hit, time, y = self.level.sweep_box(self.step_start.x + self.BOX_LEFT, self.step_start.y + edge,
+                                            self.position.x + self.BOX_LEFT, self.position.y + edge, self.BOX_WIDTH, offset)
+        return hit, y
 
-        #Animate the player attack
+    def check_animations(self, dt):
+        """Play the attack, jump or move clip (in that order) and end the attack and jump when their clip is done"""
+        #Turning around in the middle of an attack or jump carries on from the same time
         if self.animate_fire:
-            if self.velocity.x > 0:
-                self.animate(self.attack_right_sprites, .25)
-            else:
-                self.animate(self.attack_left_sprites, .25)
+            self.animator.play(self.attack_right_clip if self.velocity.x > 0 else self.attack_left_clip,
+                               self.animator.clip not in (self.attack_right_clip, self.attack_left_clip))
+        elif self.animate_jump:
+            self.animator.play(self.jump_right_clip if self.velocity.x > 0 else self.jump_left_clip,
+                               self.animator.clip not in (self.jump_right_clip, self.jump_left_clip))
+        else:
+            self.animator.play(self.move_clip)
+
+        if self.animator.update(dt):
+            self.image = self.animator.image
+            self.mask = asset_cache.get_mask(self.image)
+
+        #End the jump and attack animations (and leave their clip so the next one starts from the beginning)
+        if self.animator.finished:
+            self.animate_jump = False
+            self.animate_fire = False
+            self.animator.play(self.move_clip)
 
     def jump(self):
         """Jump upwards if on a platform"""
         #Only jump if on a platform
-        if pygame.sprite.spritecollide(self, my_platform_group, False):
-            self.jump_sound.play()
+        if self.platform_group.collide(self):
+            sound_bank.play('jump')
             self.velocity.y = -1*self.VERTICAL_JUMP_SPEED
             self.animate_jump = True
 
     def fire(self):
         """Fire a (bullet)"""
-        self.slash_sound.play()
-        Bullet(self.rect.centerx, self.rect.centery, self.bullet_group, self)
+        sound_bank.play('slash')
+        self.bullet_pool.acquire(self.rect.centerx, self.rect.centery, self)
         self.animate_fire = True
 
     def reset(self):
-        """Reset the player's position"""
+        """Reset the player's position and animation"""
         self.velocity = vector(0, 0)
         self.position = vector(self.starting_x, self.starting_y)
+        self.step_start = vector(self.position)
         self.rect.bottomleft = self.position
 
-    def animate(self, sprite_list, speed):
-        """Animate the player's actions"""
-        if self.current_sprite < len(sprite_list) -1:
-            self.current_sprite += speed
-        else:
-            self.current_sprite = 0
-            #End the Jump animation
-            if self.animate_jump:
-                self.animate_jump = False
-            #End the Attack animation
-            if self.animate_fire:
-                self.animate_fire = False
-        
-        self.image = sprite_list[int(self.current_sprite)]
+        self.animator = Animator(self.idle_right_clip)
+        self.move_clip = self.idle_right_clip
+        self.image = self.animator.image
+        self.mask = asset_cache.get_mask(self.image)
+        self.animate_jump = False
+        self.animate_fire = False
 
-class Bullet(pygame.sprite.Sprite):
+class SpritePool():
+    """A class to reuse sprites instead of making new ones"""
+
+    def __init__(self, sprite_class, sprite_args, size):
+        """Initialize the pool and make size sprites up front"""
+        self.sprite_class = sprite_class
+        self.sprite_args = sprite_args
+        self.free_sprites = []
+
+        #Pool statistics
+        self.created = 0
+        self.acquired = 0
+        self.released = 0
+
+        for i in range(size):
+            self.release(self.create())
+
+        #Sprites made up front don't count as releases
+        self.released = 0
+
+    def create(self):
+        """Make a new sprite for the pool"""
+        sprite = self.sprite_class(*self.sprite_args)
+        sprite.pool = self
+        self.created += 1
+        return sprite
+
+    def acquire(self, *args):
+        """Take a free sprite (or make one if none are free) and spawn it with args"""
+        if self.free_sprites:
+            sprite = self.free_sprites.pop()
+        else:
+            sprite = self.create()
+
+        sprite.in_pool = False
+        self.acquired += 1
+        sprite.spawn(*args)
+        return sprite
+
+    def release(self, sprite):
+        """Give a sprite back to the pool"""
+        if not sprite.in_pool:
+            sprite.in_pool = True
+            self.released += 1
+            self.free_sprites.append(sprite)
+
+    def get_stats(self):
+        """Return the pool statistics"""
+        return {
+            "created": self.created,
+            "acquired": self.acquired,
+            "released": self.released,
+            "free": len(self.free_sprites),
+            "in_use": self.created - len(self.free_sprites),
+        }
+
+class PooledSprite(pygame.sprite.Sprite):
+    """A sprite that goes back to its pool once it is in no groups"""
+
+    def __init__(self):
+        """Initialize the pooled sprite"""
+        super().__init__()
+        self.pool = None
+        self.in_pool = False
+
+    def remove_internal(self, group):
+        """Retire the sprite when its last group is emptied"""
+        super().remove_internal(group)
+        if not self.alive():
+            self.retire()
+
+    def kill(self):
+        """Remove the sprite from every group and retire it"""
+        super().kill()
+        self.retire()
+
+    def retire(self):
+        """Give the sprite back to its pool"""
+        if self.pool is not None:
+            self.pool.release(self)
+
+class Bullet(PooledSprite):
     """A projectile launched by the player"""
 
-    def __init__(self, x, y, bullet_group, player):
+    def __init__(self, bullet_group):
         """Initialize the bullet"""
         super().__init__()
 
+        #Attach sprite groups
+        self.bullet_group = bullet_group
+
+    def spawn(self, x, y, player):
+        """Launch the bullet from (x, y) in the direction the player is moving"""
         #Set constant variables
         self.VELOCITY = 20
         self.RANGE = 500
 
         #Load image and get rect
         if player.velocity.x > 0:
-            self.image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'player', 'slash.png')), (32, 32))
+            self.image = asset_cache.load_frame(join('Assets', 'images', 'player', 'slash.png'), (32, 32))
         else:
-            self.image = pygame.transform.scale(pygame.transform.flip(pygame.image.load(join('Assets', 'images', 'player', 'slash.png')), True, False), (32, 32))
+            self.image = asset_cache.load_frame(join('Assets', 'images', 'player', 'slash.png'), (32, 32), True)
             self.VELOCITY = -1*self.VELOCITY
 
+        self.mask = asset_cache.get_mask(self.image)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
 
         self.starting_x = x
 
-        bullet_group.add(self)
+        self.bullet_group.add(self)
 
-    def update(self):
+    def update(self, dt):
         """Update the bullet"""
         self.rect.x += self.VELOCITY
         
@@ -693,155 +2000,314 @@ class Bullet(pygame.sprite.Sprite):
         if abs(self.rect.x - self.starting_x) > self.RANGE:
             self.kill()
 
-class Zombie(pygame.sprite.Sprite):
-    """An enemy class to move across the screen"""
+class Kinematics():
+    """A class to keep every zombie and ruby position and velocity in arrays and move them all at once"""
+
+    def __init__(self, level, capacity):
+        """Initialize the kinematics engine"""
+        self.level = level
+        self.width = level.width
+
+        #One row per body (structure of arrays)
+        self.position = np.zeros((capacity, 2))
+        self.velocity = np.zeros((capacity, 2))
+        self.acceleration = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2), dtype=int)
+        #Where the body's rect was moved to this frame
+        self.rect_position = np.zeros((capacity, 2))
+        #Slots that are in use and bodies that are moving (dead zombies stand still)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.moving = np.zeros(capacity, dtype=bool)
+
+        #Free slots are a heap so the lowest one is always used first (slots then only depend on which bodies are alive,
+        #so an engine that was reset fills them just like a new one)
+        self.bodies = [None] * capacity
+        self.free_slots = list(range(capacity))
+
+
+    def add(self, body, size):
+        """Give a body a slot and return it"""
+        if not self.free_slots:
+            self.grow()
+        slot = heapq.heappop(self.free_slots)
+
+        self.bodies[slot] = body
+        self.size[slot] = size
+        self.position[slot] = 0
+        self.velocity[slot] = 0
+        self.acceleration[slot] = 0
+        self.rect_position[slot] = 0
+        self.active[slot] = True
+        self.moving[slot] = True
+        return slot
+
+    def remove(self, slot):
+        """Free a body's slot"""
+        self.bodies[slot] = None
+        self.active[slot] = False
+        self.moving[slot] = False
+        heapq.heappush(self.free_slots, slot)
+
+    def grow(self):
+        """Double the number of slots"""
+        capacity = len(self.bodies)
+        for name in ('position', 'velocity', 'acceleration', 'size', 'rect_position', 'active', 'moving'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate((array, np.zeros_like(array))))
+        self.bodies.extend([None] * capacity)
+        #Every new slot is above every free one, so the heap stays in order
+        self.free_slots.extend(range(capacity, 2 * capacity))
 
-    def __init__(self, platform_group, portal_group, min_speed, max_speed):
-        """Initialize the zombie"""
+    def update(self):
+        """Move, wrap around and land every moving body"""
+        slots = np.flatnonzero(self.moving)
+        if len(slots) == 0:
+            return
+
+        #Calculate new kinematics values:
+        acceleration = self.acceleration[slots]
+        start = self.position[slots]
+        velocity = self.velocity[slots] + acceleration
+        position = start + velocity + 0.5*acceleration
+
+        #Sweep each body's bottom edge down to the first platform it reaches this step (so fast bodies can not fall through)
+        hit, time, landing_y = self.level.sweep(start, position, self.size[slots, 0], 1)
+        landed = hit & (velocity[:, 1] >= 0)
+        fall_y = position[:, 1].copy()
+        position[landed, 1] = landing_y[landed]
+        velocity[landed, 1] = 0
+
+        #Wrap around movement
+        x = position[:, 0]
+        position[:, 0] = np.where(x < 0, self.width, np.where(x > self.width, 0, x))
+
+        #Rects are placed with their bottom left at the position (rounded the way pygame rounds).
+        #A landed body is drawn sunk into the platform as far as it falls in one step from rest, like a body standing on it
+        rect_position = position.copy()
+        rect_position[landed, 1] = np.minimum(fall_y[landed], landing_y[landed] + 1.5*acceleration[landed, 1])
+        self.rect_position[slots] = np.trunc(rect_position + np.copysign(0.5, rect_position))
+
+        self.position[slots] = position
+        self.velocity[slots] = velocity
+
+class BodyVector():
+    """A 2D vector that reads and writes one row of a kinematics array"""
+
+    def __init__(self, kinematics, name, slot):
+        """Initialize the body vector"""
+        self.kinematics = kinematics
+        self.name = name
+        self.slot = slot
+
+    @property
+    def x(self):
+        return getattr(self.kinematics, self.name)[self.slot, 0]
+
+    @x.setter
+    def x(self, value):
+        getattr(self.kinematics, self.name)[self.slot, 0] = value
+
+    @property
+    def y(self):
+        return getattr(self.kinematics, self.name)[self.slot, 1]
+
+    @y.setter
+    def y(self, value):
+        getattr(self.kinematics, self.name)[self.slot, 1] = value
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, index):
+        return getattr(self.kinematics, self.name)[self.slot, index]
+
+class Body(PooledSprite):
+    """A sprite whose position and velocity live in the kinematics engine while it is spawned"""
+
+    def __init__(self, kinematics, size, detail):
+        """Initialize the body (it takes a kinematics slot when it spawns)"""
         super().__init__()
+        self.kinematics = kinematics
+        self.size = size
+        self.slot = None
+
+        #Far from the player, the animation frame is only worked out every few steps (see animate)
+        self.detail = detail
+        self.animation_lag = 0
+        self.animation_count = 0
+        self.animation_steps = 1
+
+    @property
+    def position(self):
+        return BodyVector(self.kinematics, 'position', self.slot)
+
+    @position.setter
+    def position(self, value):
+        self.kinematics.position[self.slot] = value
+
+    @property
+    def velocity(self):
+        return BodyVector(self.kinematics, 'velocity', self.slot)
+
+    @velocity.setter
+    def velocity(self, value):
+        self.kinematics.velocity[self.slot] = value
+
+    @property
+    def acceleration(self):
+        return BodyVector(self.kinematics, 'acceleration', self.slot)
+
+    @acceleration.setter
+    def acceleration(self, value):
+        self.kinematics.acceleration[self.slot] = value
+
+    @property
+    def mask(self):
+        """The collision mask of the current frame (an animation that is behind catches up first)"""
+        if self.animation_lag:
+            self.update_frame()
+        return self.frame_mask
+
+    @mask.setter
+    def mask(self, value):
+        self.frame_mask = value
+
+    def start_animation(self, clip):
+        """Start playing a clip from the beginning"""
+        self.animator = Animator(clip)
+        self.image = self.animator.image
+        self.mask = asset_cache.get_mask(self.image)
+        self.animation_lag = 0
+        self.animation_count = 0
+        self.animation_steps = 1
+
+    def get_animation_steps(self):
+        """Return how many steps apart the animation frame should be worked out"""
+        return self.detail.get_steps(self.rect)
+
+    def animate(self, dt):
+        """Advance the animation dt seconds, working out the frame every animation_steps calls (checked again after each frame).
+        Collisions always see the frame of every step, because the mask catches up before it is used"""
+        if self.animation_steps > 1:
+            self.animation_count += 1
+            if self.animation_count < self.animation_steps:
+                self.animation_lag += dt
+                return
+            dt += self.animation_lag
+            self.animation_lag = 0
+            self.animation_count = 0
+            self.animation_steps = 1
+
+        #Work out the frame (the same as update_frame, inlined because almost every body does this every step)
+        if self.animator.update(dt):
+            self.image = self.animator.image
+            self.frame_mask = asset_cache.get_mask(self.image)
+        if self.detail.far_steps > 1:
+            self.animation_steps = self.get_animation_steps()
+
+    def update_frame(self):
+        """Work out the frame for all the animation time so far"""
+        dt = self.animation_lag
+        self.animation_lag = 0
+        self.animation_count = 0
+        if self.animator.update(dt):
+            self.image = self.animator.image
+            self.frame_mask = asset_cache.get_mask(self.image)
+
+    def get_rect_position(self):
+        """Return where the kinematics engine moved the rect this frame"""
+        return self.kinematics.rect_position[self.slot]
+
+    def take_slot(self):
+        """Take a kinematics slot if the body doesn't have one"""
+        if self.slot is None:
+            self.slot = self.kinematics.add(self, self.size)
+
+    def retire(self):
+        """Give the slot back to the kinematics engine and the body back to its pool"""
+        if self.slot is not None:
+            self.kinematics.remove(self.slot)
+            self.slot = None
+        super().retire()
+
+class Zombie(Body):
+    """An enemy class to move across the screen"""
+
+    def __init__(self, portal_group, kinematics, level, detail):
+        """Initialize the zombie (platforms are handled by the kinematics engine)"""
+        super().__init__(kinematics, (64, 64), detail)
 
         #Set Constant variables
         self.VERTICAL_ACCELERATION = 3 #Gravity
         self.RISE_TIME = 2
 
-        #Animation Frames
-        self.walk_right_sprites = []
-        self.walk_left_sprites = []
-        self.die_right__sprites = []
-        self.die_left_sprites = []
-        self.rise_right_sprites = []
-        self.rise_left_sprites = []
+        #Attach sprite groups and the level
+        self.portal_group = portal_group
+        self.level = level
+
+    def spawn(self, rng, min_speed, max_speed):
+        """Drop the zombie in from the top of the screen with a speed between min_speed and max_speed"""
+        self.take_slot()
 
-        gender = random.randint(0, 1)
+        #Animation clips (shared with every other zombie through the asset cache)
+        gender = rng.randint(0, 1)
         #0 -> Male, 1 -> Female
-        if gender == 0:
-            #Walking
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (1).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (2).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (3).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (4).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (5).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (6).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (7).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (8).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (9).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'walk', 'Walk (10).png')), (64, 64)))
-            for sprite in self.walk_right_sprites:
-                self.walk_left_sprites.append(pygame.transform.flip(sprite, True, False))
-            
-            #Dying
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (1).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (2).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (3).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (4).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (5).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (6).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (7).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (8).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (9).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (10).png')), (64, 64)))
-            for sprite in self.die_right__sprites:
-                self.die_left_sprites.append(pygame.transform.flip(sprite, True, False))
-        
-            #Rising
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (10).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (9).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (8).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (7).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (6).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (5).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (4).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (3).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (2).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'boy', 'dead', 'Dead (1).png')), (64, 64)))
-            for sprite in self.rise_right_sprites:
-                self.rise_left_sprites.append(pygame.transform.flip(sprite, True, False))
-        else:
-            #Walking
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (1).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (2).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (3).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (4).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (5).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (6).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (7).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (8).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (9).png')), (64, 64)))
-            self.walk_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'walk', 'Walk (10).png')), (64, 64)))
-            for sprite in self.walk_right_sprites:
-                self.walk_left_sprites.append(pygame.transform.flip(sprite, True, False))
-            
-            #Dying
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (1).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (2).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (3).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (4).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (5).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (6).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (7).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (8).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (9).png')), (64, 64)))
-            self.die_right__sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (10).png')), (64, 64)))
-            for sprite in self.die_right__sprites:
-                self.die_left_sprites.append(pygame.transform.flip(sprite, True, False))
-
-            #Rising
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (10).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (9).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (8).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (7).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (6).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (5).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (4).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (3).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (2).png')), (64, 64)))
-            self.rise_right_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'zombie', 'girl', 'dead', 'Dead (1).png')), (64, 64)))
-            for sprite in self.rise_right_sprites:
-                self.rise_left_sprites.append(pygame.transform.flip(sprite, True, False))
+        walk_right_clip, walk_left_clip, die_right_clip, die_left_clip, rise_right_clip, rise_left_clip = Zombie.load_clips(gender)
 
         #Load an image and get rect
-        self.direction = random.choice([-1,1])
+        self.direction = rng.choice([-1,1])
 
-        self.current_sprite = 0
+        #A zombie faces the way it walks for its whole life
         if self.direction == -1:
-            self.image = self.walk_left_sprites[self.current_sprite]
+            self.walk_clip, self.die_clip, self.rise_clip = walk_left_clip, die_left_clip, rise_left_clip
         else:
-            self.image = self.walk_right_sprites[self.current_sprite]
+            self.walk_clip, self.die_clip, self.rise_clip = walk_right_clip, die_right_clip, rise_right_clip
 
+        self.start_animation(self.walk_clip)
         self.rect = self.image.get_rect()
-        self.rect.bottomleft = (random.randint(100, WINDOW_WIDTH - 100), -100)
-
-        #Attach sprite groups
-        self.platform_group = platform_group
-        self.portal_group = portal_group
+        self.rect.bottomleft = (rng.randint(100, self.level.width - 100), -100)
 
         #Animation booleans
         self.animate_death = False
         self.animate_rise = False
 
-        #Load sounds 
-        self.hit_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'zombie_hit.wav'))
-        self.hit_sound.set_volume(.25)
-        self.kick_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'zombie_kick.wav'))
-        self.kick_sound.set_volume(.25)
-        self.portal_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'portal_sound.wav'))
-        self.portal_sound.set_volume(.25)
-
-        #Kinematics vectors
+        #Kinematics vectors (stored in the kinematics engine)
         self.position = vector(self.rect.x, self.rect.y)
-        self.velocity = vector((self.direction * (random.randint(min_speed, max_speed))), 0)
+        self.velocity = vector((self.direction * (rng.randint(min_speed, max_speed))), 0)
         self.acceleration = vector(0, self.VERTICAL_ACCELERATION)
 
         #Initial zombie values
+        self.dead = False
         self.is_dead = False
         self.round_time = 0
         self.frame_count = 0
 
-    def update(self):
+    @staticmethod
+    def load_clips(gender):
+        """Return the walk, die and rise clips for a male (0) or female (1) zombie"""
+        folder = 'boy' if gender == 0 else 'girl'
+        walk_paths = [join('Assets', 'images', 'zombie', folder, 'walk', f'Walk ({i}).png') for i in range(1, 11)]
+        dead_paths = [join('Assets', 'images', 'zombie', folder, 'dead', f'Dead ({i}).png') for i in range(1, 11)]
+
+        #Walking
+        walk_right_clip = asset_cache.load_clip(walk_paths, (64, 64), 30)
+        walk_left_clip = asset_cache.load_clip(walk_paths, (64, 64), 30, flip=True)
+
+        #Dying (lying on the last frame until rising)
+        die_right_clip = asset_cache.load_clip(dead_paths, (64, 64), 6, 'hold')
+        die_left_clip = asset_cache.load_clip(dead_paths, (64, 64), 6, 'hold', True)
+
+        #Rising (the dying frames played backwards)
+        rise_right_clip = asset_cache.load_clip(reversed(dead_paths), (64, 64), 6, 'hold')
+        rise_left_clip = asset_cache.load_clip(reversed(dead_paths), (64, 64), 6, 'hold', True)
+
+        return (walk_right_clip, walk_left_clip, die_right_clip, die_left_clip, rise_right_clip, rise_left_clip)
+
+    def update(self, dt):
         """Update the zombie"""
         self.move()
         self.check_collisions()
-        self.check_animations()
+        self.check_animations(dt)
 
         #Determine when the zombie
         if self.is_dead:
@@ -850,94 +2316,78 @@ class Zombie(pygame.sprite.Sprite):
                 self.round_time += 1
                 if self.round_time == self.RISE_TIME:
                     self.animate_rise = True
-                    #When the zombie died, the image was kept as the last image
-                    #When it rises, we want to start at index 0 of our rise_sprites lists
-                    self.current_sprite = 0
-
-    def move(self):
-        """Move the zombie"""
-        if not self.is_dead:
-            if self.direction == -1:
-                self.animate(self.walk_left_sprites, 0.5)
-            else:
-                self.animate(self.walk_right_sprites, 0.5)
-            #We don't need to update the acceleration vector
+                    self.animator.play(self.rise_clip)
 
-            #Calculate new kinematics values: 
-            self.velocity += self.acceleration
-            self.position += self.velocity + 0.5*self.acceleration
+    @property
+    def is_dead(self):
+        return self.dead
 
-            #Update rect based on kinematics and wrap around movement
-            if self.position.x < 0:
-                self.position.x = WINDOW_WIDTH
-            elif self.position.x > WINDOW_WIDTH:
-                self.position.x = 0
+    @is_dead.setter
+    def is_dead(self, is_dead):
+        """A dead zombie is not moved by the kinematics engine"""
+        self.dead = is_dead
+        if self.slot is not None:
+            self.kinematics.moving[self.slot] = not is_dead
 
-            self.rect.bottomleft = self.position
+    def move(self):
+        """Move the zombie (the kinematics engine has already moved and landed every zombie)"""
+        if not self.is_dead:
+            #Update rect based on kinematics
+            self.rect.bottomleft = self.get_rect_position()
 
     def check_collisions(self):
-        """Check for collisions with platforms and portals"""
-        #Collision check between zombie and platforms when falling
-        collided_platforms = pygame.sprite.spritecollide(self, self.platform_group, False)
-        if collided_platforms:
-            self.position.y = collided_platforms[0].rect.top + 1
-            self.velocity.y = 0 
-
+        """Check for collisions with portals"""
         #Collision check for portals
         if pygame.sprite.spritecollide(self, self.portal_group, False):
-            self.portal_sound.play()
+            sound_bank.play('portal')
             #Determine which portal you are moving to
             #Left and right
-            if self.position.x > WINDOW_WIDTH / 2:
+            if self.position.x > self.level.width / 2:
                 self.position.x = 86
             else:
-                self.position.x = WINDOW_WIDTH - 150
+                self.position.x = self.level.width - 150
             #Top and Bottom
-            if self.position.y > WINDOW_HEIGHT / 2:
+            if self.position.y > self.level.height / 2:
                 self.position.y = 64
             else:
-                self.position.y = WINDOW_HEIGHT - 132
+                self.position.y = self.level.height - 132
 
             self.rect.bottomleft = self.position
 
-    def check_animations(self):
-        """Check to see if death or rise animations should run"""
-        #Animate the zombie death
+    def check_animations(self, dt):
+        """Start dying when shot, animate and come back to life when the rise clip is done"""
+        #A zombie shot while rising dies again and waits the full rise time (shooting a lying zombie changes nothing)
         if self.animate_death:
-            if self.direction == 1:
-                self.animate(self.die_right__sprites, .095)
-            else:
-                self.animate(self.die_left_sprites, .095)
-        
-        #Animate the zombie rise
-        if self.animate_rise:
-            if self.direction == 1:
-                self.animate(self.rise_right_sprites, .095)
-            else:
-                self.animate(self.rise_left_sprites, .095)
-
-    def reset(self):
-        """Reset the zombie's position"""
-        pass
-
-    def animate(self, sprite_list, speed):
-        """Animate the zombie's actions"""
-        if self.current_sprite < len(sprite_list) -1:
-            self.current_sprite += speed
-        else:
-            self.current_sprite = 0
-            #End the death animation
-            if self.animate_death:
-                self.current_sprite = len(sprite_list) - 1
-                self.animate_death = False
-            #End the rise animation
+            self.animate_death = False
             if self.animate_rise:
                 self.animate_rise = False
-                self.is_dead = False
                 self.frame_count = 0
                 self.round_time = 0
-                
-        self.image = sprite_list[int(self.current_sprite)]
+            #The walk frames that haven't been worked out yet don't matter any more
+            self.animation_lag = 0
+            self.animation_count = 0
+            self.animation_steps = 1
+            self.animator.play(self.die_clip)
+
+        self.animate(dt)
+
+        #End the rise animation
+        if self.animate_rise and self.animator.finished:
+            self.animate_rise = False
+            self.is_dead = False
+            self.frame_count = 0
+            self.round_time = 0
+            self.animator.play(self.walk_clip)
+
+    def get_animation_steps(self):
+        """Only walking zombies skip frames (dying and rising always play every step)"""
+        if self.is_dead:
+            return 1
+        return self.detail.get_steps(self.rect)
+
+    def reset(self):
+        """Reset the zombie's position"""
+        pass
 
 class RubyMaker(pygame.sprite.Sprite):
     """A tile that is animater. A Ruby will be generated here"""
@@ -946,230 +2396,435 @@ class RubyMaker(pygame.sprite.Sprite):
         """Initialize the ruby maker"""
         super().__init__()
 
-        #Animation frames
-        self.ruby_sprites = []
+        #Animation clip
+        #Rotating
+        self.animator = Animator(Ruby.load_clip())
 
-        #Rotating 
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile000.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile001.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile002.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile003.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile004.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile005.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile006.png')), (64,64)))
+        #Animation time not worked out into a frame yet (only ruby makers in view are, when they are drawn)
+        self.animation_lag = 0
 
         #Load image and get rect
-        self.current_sprite = 0 
-        self.image = self.ruby_sprites[self.current_sprite]
+        self.image = self.animator.image
         self.rect = self.image.get_rect()
         self.rect.bottomleft = (x, y)
 
         #Add to the main group for drawing purposes
         main_group.add(self)
 
-    def update(self):
+    def reset(self):
+        """Start the animation over"""
+        self.animator = Animator(self.animator.clip)
+        self.image = self.animator.image
+        self.animation_lag = 0
+
+    def update(self, dt):
         """Update the ruby maker"""
-        self.animate(self.ruby_sprites, .25)
+        self.animation_lag += dt
 
-    def animate(self, sprite_list, speed):
-        """Animate the ruby maker"""
-        if self.current_sprite < len(sprite_list) -1:
-            self.current_sprite += speed
-        else:
-            self.current_sprite = 0
-        
-        self.image = sprite_list[int(self.current_sprite)]
+    def update_frame(self):
+        """Work out the frame for all the animation time so far"""
+        if self.animation_lag:
+            if self.animator.update(self.animation_lag):
+                self.image = self.animator.image
+            self.animation_lag = 0
 
-class Ruby(pygame.sprite.Sprite):
+class Ruby(Body):
     """A class the player must collect to earn points and health"""
 
-    def __init__(self, platform_group, portal_group):
-        """Initialize a ruby"""
-        super().__init__()
+    def __init__(self, portal_group, kinematics, level, detail):
+        """Initialize a ruby (platforms are handled by the kinematics engine)"""
+        super().__init__(kinematics, (64, 64), detail)
 
         #Set constant variables
         self.VERTICAL_ACCELERATION = 3
         self.HORIZONTAL_VELOCITY = 5
         
-        #Animation frames
-        self.ruby_sprites = []
-        
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile000.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile001.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile002.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile003.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile004.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile005.png')), (64,64)))
-        self.ruby_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'ruby', 'tile006.png')), (64,64)))
+        #Animation clip (shared with every other ruby through the asset cache)
+        self.ruby_clip = Ruby.load_clip()
+
+        #Attach sprite groups and the level
+        self.portal_group = portal_group
+        self.level = level
+
+    def spawn(self, rng):
+        """Drop the ruby from the ruby maker"""
+        self.take_slot()
 
         #Load image and get rect
-        self.current_sprite = 0
-        self.image = self.ruby_sprites[self.current_sprite]
+        self.start_animation(self.ruby_clip)
         self.rect = self.image.get_rect()
-        self.rect.bottomleft = (WINDOW_WIDTH/2, 100)
-
-        #Attach sprite groups
-        self.platform_group = platform_group
-        self.portal_group = portal_group
 
-        #Load sounds
-        self.portal_sound = pygame.mixer.Sound(join('Assets', 'sounds', 'portal_sound.wav'))
-        self.portal_sound.set_volume(.25)
+        #Drop from the middle of a ruby maker, just below it (only pick one at random when the level has more than one)
+        ruby_makers = self.level.ruby_makers
+        x, y = ruby_makers[rng.randrange(len(ruby_makers))] if len(ruby_makers) > 1 else ruby_makers[0]
+        self.rect.bottomleft = (x + self.rect.width // 2, y + 4)
 
-        #Kinematic vector
+        #Kinematic vector (stored in the kinematics engine)
         self.position = vector(self.rect.x, self.rect.y)
-        self.velocity = vector(random.choice([-1*self.HORIZONTAL_VELOCITY, self.HORIZONTAL_VELOCITY]), 0)
+        self.velocity = vector(rng.choice([-1*self.HORIZONTAL_VELOCITY, self.HORIZONTAL_VELOCITY]), 0)
         self.acceleration = vector(0, self.VERTICAL_ACCELERATION)
 
-    def update(self):
+    @staticmethod
+    def load_clip():
+        """Return the rotating ruby clip"""
+        ruby_paths = [join('Assets', 'images', 'ruby', f'tile{i:03}.png') for i in range(7)]
+        return asset_cache.load_clip(ruby_paths, (64, 64), 15)
+
+    def update(self, dt):
         """Update the ruby"""
-        self.animate(self.ruby_sprites, .25)
+        self.animate(dt)
         self.move()
         self.check_collisions()
 
     def move(self):
-        """Move the ruby"""
-        #Calculate new kinematics values: 
-        self.velocity += self.acceleration
-        self.position += self.velocity + 0.5*self.acceleration
-
-        #Update rect based on kinematics and wrap around movement
-        if self.position.x < 0:
-            self.position.x = WINDOW_WIDTH
-        elif self.position.x > WINDOW_WIDTH:
-            self.position.x = 0
-
-        self.rect.bottomleft = self.position
+        """Move the ruby (the kinematics engine has already moved and landed every ruby)"""
+        #Update rect based on kinematics
+        self.rect.bottomleft = self.get_rect_position()
 
     def check_collisions(self):
-        """Check collisions with platforms and portals"""
-        #We don't need to update the acceleration vector
-
-        #Collision check between ruby and platforms when falling
-        collided_platforms = pygame.sprite.spritecollide(self, self.platform_group, False)
-        if collided_platforms:
-            self.position.y = collided_platforms[0].rect.top + 1
-            self.velocity.y = 0 
-
+        """Check collisions with portals"""
         #Collision check for portals
         if pygame.sprite.spritecollide(self, self.portal_group, False):
-            self.portal_sound.play()
+            sound_bank.play('portal')
             #Determine which portal you are moving to
             #Left and right
-            if self.position.x > WINDOW_WIDTH / 2:
+            if self.position.x > self.level.width / 2:
                 self.position.x = 86
             else:
-                self.position.x = WINDOW_WIDTH - 150
+                self.position.x = self.level.width - 150
             #Top and Bottom
-            if self.position.y > WINDOW_HEIGHT / 2:
+            if self.position.y > self.level.height / 2:
                 self.position.y = 64
             else:
-                self.position.y = WINDOW_HEIGHT - 132
+                self.position.y = self.level.height - 132
 
             self.rect.bottomleft = self.position
 
-    def animate(self, sprite_list, speed):
-        """Animate the ruby"""
-        if self.current_sprite < len(sprite_list) -1:
-            self.current_sprite += speed
-        else:
-            self.current_sprite = 0
-        
-        self.image = sprite_list[int(self.current_sprite)]
-
 class Portal(pygame.sprite.Sprite):
     """A class that if collided with will transport you"""
 
-    def __init__(self, x, y, color, portal_group):
+    def __init__(self, x, y, color, portal_group, rng):
         """Initialize the portal"""
         super().__init__()
 
-        #Animation frames
-        self.portal_sprites = []
-
-        #Portal animation
-        if color == "green":
-            #Green portal
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile000.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile001.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile002.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile003.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile004.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile005.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile006.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile007.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile008.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile009.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile010.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile011.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile012.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile013.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile014.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile015.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile016.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile017.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile018.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile019.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile020.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'green', 'tile021.png')), (72,72)))
-        else:
-            #Purple Portal
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile000.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile001.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile002.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile003.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile004.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile005.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile006.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile007.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile008.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile009.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile010.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile011.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile012.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile013.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile014.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile015.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile016.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile017.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile018.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile019.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile020.png')), (72,72)))
-            self.portal_sprites.append(pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'portals', 'purple', 'tile021.png')), (72,72)))
+        #Animation clip
+        #Portal animation (green or purple)
+        folder = 'green' if color == "green" else 'purple'
+        portal_paths = [join('Assets', 'images', 'portals', folder, f'tile{i:03}.png') for i in range(22)]
+        portal_clip = asset_cache.load_clip(portal_paths, (72, 72), 6)
 
-        #Load an image and get rect
-        self.current_sprite = random.randint(0, len(self.portal_sprites)-1)
-        self.image = self.portal_sprites[self.current_sprite]
+        #Load an image (starting on a random frame so portals are out of step) and get rect
+        self.portal_clip = portal_clip
+        self.reset(rng)
         self.rect = self.image.get_rect()
         self.rect.bottomleft = (x, y)
 
         #Add to Portal Group
         portal_group.add(self)
 
-    def update(self):
-        """Update the portal"""
-        self.animate(self.portal_sprites, .1)
+    def reset(self, rng):
+        """Start the animation on a random frame"""
+        self.animator = Animator(self.portal_clip, rng.randint(0, len(self.portal_clip.frames)-1) / self.portal_clip.fps)
+        self.image = self.animator.image
 
-    def animate(self, sprite_list, speed):
-        """Animate the portal"""
-        if self.current_sprite < len(sprite_list) -1:
-            self.current_sprite += speed
+    def update(self, dt):
+        """Update the portal"""
+        if self.animator.update(dt):
+            self.image = self.animator.image
+
+class InputRecorder():
+    """A class to record the seed and the inputs of every step so a session can be replayed"""
+
+    def __init__(self, seed):
+        """Initialize the recorder"""
+        self.seed = seed
+        #One byte of INPUT_ flags per step
+        self.inputs = bytearray()
+
+    def record(self, inputs):
+        """Record one step's inputs"""
+        self.inputs.append(inputs)
+
+    def save(self, path, checksum):
+        """Save the recording, with inputs stored as [inputs, number of steps] runs"""
+        runs = []
+        for inputs in self.inputs:
+            if runs and runs[-1][0] == inputs:
+                runs[-1][1] += 1
+            else:
+                runs.append([inputs, 1])
+
+        with open(path, 'w') as recording_file:
+            json.dump({"seed": self.seed, "frames": len(self.inputs), "checksum": checksum, "inputs": runs}, recording_file)
+
+class InputReplay():
+    """A class to play back a recording made by InputRecorder"""
+
+    def __init__(self, path):
+        """Load the recording"""
+        with open(path) as recording_file:
+            recording = json.load(recording_file)
+
+        self.seed = recording["seed"]
+        self.checksum = recording["checksum"]
+        self.inputs = bytearray()
+        for inputs, count in recording["inputs"]:
+            self.inputs.extend([inputs] * count)
+
+    def get_inputs(self, engine):
+        """Return the recorded inputs for the engine's next step"""
+        if engine.frame_count < len(self.inputs):
+            return self.inputs[engine.frame_count]
+        return 0
+
+class Engine():
+    """A class to build the level and step the game one frame at a time, with or without a window"""
+
+    def __init__(self, level_map, render=True, interactive=True, use_dirty_rects=False, pool_sizes=POOL_SIZES, seed=None, kinematics=None):
+        """Build the level from a tile map (a list of rows of any size). pool_sizes is how many bullets, zombies and rubies to make up front.
+        The same seed and inputs always play out the same way (a random seed is picked if there isn't one).
+        Engines stepped together can share one kinematics engine, which whoever shares it then has to update"""
+        self.render = render
+
+        #Seeded random number generator (handed to the game, which owns it)
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.random = random.Random(seed)
+
+        #Inputs are recorded here if there is a recorder
+        self.recorder = None
+
+        #Times each phase of a frame when it is enabled
+        self.profiler = FrameProfiler(240)
+
+        #Create sprite group
+        self.main_tile_group = pygame.sprite.Group()
+        self.platform_group = PlatformGroup(32)
+
+        self.player_group = pygame.sprite.Group()
+        self.bullet_group = pygame.sprite.Group()
+
+        self.zombie_group = pygame.sprite.Group()
+
+        self.portal_group = pygame.sprite.Group()
+        self.ruby_group = pygame.sprite.Group()
+
+        #Store the level as chunks
+        self.level = ChunkedMap(level_map, 32, CHUNK_SIZE)
+
+        #Zombie and ruby positions and velocities are moved together
+        self.update_kinematics = kinematics is None
+        self.kinematics = kinematics if kinematics else Kinematics(self.level, 256)
+
+        #Warm up the asset cache so spawning zombies, rubies and bullets never touches disk
+        #(the first engine waits here for any of their images that are still being decoded)
+        Zombie.load_clips(0)
+        Zombie.load_clips(1)
+        Ruby.load_clip()
+        asset_cache.load_frame(join('Assets', 'images', 'player', 'slash.png'), (32, 32))
+        asset_cache.load_frame(join('Assets', 'images', 'player', 'slash.png'), (32, 32), True)
+
+        #How often decorative and far away animations work out their frame (full detail unless a quality governor lowers it)
+        self.detail = DetailLevel(FAR_DETAIL_DISTANCE)
+        self.quality_governor = None
+        self.decoration_time = 0
+
+        #Bullets, zombies and rubies are reused instead of made new
+        self.bullet_pool = SpritePool(Bullet, (self.bullet_group,), pool_sizes['bullet'])
+        self.zombie_pool = SpritePool(Zombie, (self.portal_group, self.kinematics, self.level, self.detail), pool_sizes['zombie'])
+        self.ruby_pool = SpritePool(Ruby, (self.portal_group, self.kinematics, self.level, self.detail), pool_sizes['ruby'])
+
+        #Portals and the player are made up front (tiles and ruby makers are made when their chunk is loaded)
+        #Loop through the rows (i moves us down) and columns (j moves us across the map) that have them
+        for i, j in zip(*np.nonzero(np.isin(self.level.get_cells(), (7, 8, 9)))):
+            i, j = int(i), int(j)
+            #Portals
+            if level_map[i][j] == 7:
+                Portal(j*32, i*32, "green", self.portal_group, self.random)
+            elif level_map[i][j] == 8:
+                Portal(j*32, i*32, "purple", self.portal_group, self.random)
+            #Player
+            elif level_map[i][j] == 9:
+                self.player = Player(j*32 - 32, i*32 + 32, self.platform_group, self.portal_group, self.bullet_pool, self.level)
+                self.player_group.add(self.player)
+
+        #Follow the player and load the chunks around them
+        self.camera = Camera(self.level)
+        self.camera.follow(self.player.rect, True)
+        self.chunk_loader = ChunkLoader(self.level, self.camera, self.main_tile_group, self.platform_group, render)
+        self.chunk_loader.update()
+
+        #Load in a background image (must resize image). Engines that are never drawn skip it
+        if render:
+            self.background_image = pygame.transform.scale(asset_cache.load_image(join('Assets', 'images', 'background.png')),(1280, 736)).convert()
         else:
-            self.current_sprite = 0
-        
-        self.image = sprite_list[int(self.current_sprite)]
+            self.background_image = None
+
+        #Bake the background and the chunks in view into one surface
+        self.level_renderer = LevelRenderer(self.background_image, self.chunk_loader)
+        self.renderer = Renderer(self.level_renderer, use_dirty_rects, .5)
 
-#Create sprite group    
-my_main_tile_group = pygame.sprite.Group()
-my_platform_group = pygame.sprite.Group()
+        #Below full size the world is drawn to a smaller scene surface and scaled up to the window (see set_render_scale)
+        self.scene_surface = None
+        self.resolution_governor = None
 
-my_player_group = pygame.sprite.Group()
-my_bullet_group = pygame.sprite.Group()
+        #Create a game object
+        self.game = Game(self.player, self.zombie_group, self.platform_group, self.portal_group, self.bullet_group, self.ruby_group, self.zombie_pool, self.ruby_pool, self.random, interactive)
+        self.game.renderer = self.renderer
 
-my_zombie_group = pygame.sprite.Group()
+        #Groups that are drawn on top of the level and where their sprites were before the last step
+        self.sprite_groups = (self.portal_group, self.player_group, self.bullet_group, self.zombie_group, self.ruby_group)
+        self.previous_positions = {}
 
-my_portal_group = pygame.sprite.Group()
-my_ruby_group = pygame.sprite.Group()
+        #Groups that only animate (and can skip steps at lower detail) and groups that play the game
+        self.decoration_groups = (self.main_tile_group, self.portal_group)
+        self.gameplay_groups = (self.player_group, self.bullet_group, self.zombie_group, self.ruby_group)
+
+        #Number of simulation steps
+        self.frame_count = 0
+
+    def reset(self, seed):
+        """Start a new game that plays out just like a new engine built with seed (for runners that play many games on one engine)"""
+        self.seed = seed
+        self.random.seed(seed)
+
+        #Portals take their starting frames from the generator first, in the order they were made
+        for portal in self.portal_group:
+            portal.reset(self.random)
+        for ruby_maker in self.main_tile_group:
+            ruby_maker.reset()
+
+        self.game.rest_game()
+        self.frame_count = 0
+        self.decoration_time = 0
+        self.previous_positions = {}
+        self.camera.follow(self.player.rect, True)
+        self.chunk_loader.update()
+
+    def step(self, inputs):
+        """Advance the game one frame and draw it. Inputs are INPUT_ flags combined with |"""
+        self.update(inputs)
+        if self.render:
+            self.draw(1)
+
+    def update(self, inputs):
+        """Advance the simulation one fixed step"""
+        if self.recorder:
+            self.recorder.record(inputs)
+
+        #Remember where everything was so drawing can interpolate between steps
+        if self.render:
+            self.previous_positions = {sprite: sprite.rect.topleft for group in self.sprite_groups for sprite in group}
+
+        #Keys pressed this frame
+        #Player wants to jump
+        if inputs & INPUT_JUMP:
+            self.player.jump()
+        #Player wants to fire
+        if inputs & INPUT_SLASH:
+            self.player.fire()
+        #Player wants to pause game
+        if inputs & INPUT_PAUSE:
+            self.game.pause_game("TAKING A BREATHER", "Press ENTER to continue....")
+
+        #Keys held down
+        self.player.input_left = bool(inputs & INPUT_LEFT)
+        self.player.input_right = bool(inputs & INPUT_RIGHT)
+
+        #Move every zombie and ruby, then update Ruby maker and the sprites
+        self.profiler.mark('events')
+        if self.update_kinematics:
+            self.kinematics.update()
+        self.profiler.mark('kinematics')
+        #Ruby makers and portals only work out their frame every few steps at lower detail
+        self.decoration_time += STEP_TIME
+        if self.frame_count % self.detail.decoration_steps == 0:
+            for group in self.decoration_groups:
+                group.update(self.decoration_time)
+            self.decoration_time = 0
+        self.profiler.mark('tiles')
+        self.detail.focus_x, self.detail.focus_y = self.player.rect.center
+        for group in self.gameplay_groups:
+            group.update(STEP_TIME)
+        self.profiler.mark('sprites')
+
+        #Update and the game
+        self.game.update()
+        sound_bank.update()
+        self.profiler.mark('game')
+
+        #Move the camera with the player and load the chunks coming into view
+        self.camera.follow(self.player.rect)
+        self.chunk_loader.update()
+        self.profiler.mark('tiles')
+
+        self.frame_count += 1
+
+    def set_render_scale(self, scale):
+        """Draw the world at scale (one of RENDER_SCALES) times the window size from the next frame on"""
+        if scale == self.renderer.scale:
+            return
+        self.renderer.set_scale(scale)
+        self.scene_surface = None if scale == 1 else pygame.Surface((round(WINDOW_WIDTH * scale), round(WINDOW_HEIGHT * scale))).convert()
+
+    def adapt_to_frame_time(self, frame_time):
+        """Let the governors (if there are any) change the level of detail and the render scale after a frame that took frame_time seconds.
+        Detail is dropped before the resolution and only comes back once the resolution is back to full size"""
+        quality_governor = self.quality_governor
+        if quality_governor and self.renderer.scale == 1:
+            self.detail.set_tier(quality_governor.update(frame_time))
+        if self.resolution_governor and (not quality_governor or quality_governor.is_lowest() or self.renderer.scale != 1):
+            self.set_render_scale(self.resolution_governor.update(frame_time))
+
+        if self.profiler.show_overlay:
+            self.profiler.status = f"detail tier {self.detail.tier} scale {self.renderer.scale}"
+
+    def draw(self, alpha):
+        """Draw the game alpha (0 to 1) of the way from the previous step to the current one"""
+        #Draw the cached background and tiles, then the sprites (to the scene surface if there is one) and HUD
+        self.profiler.mark('events')
+        surface = self.scene_surface or display_surface
+        offset = self.camera.get_offset(alpha)
+        self.renderer.clear(surface, offset)
+        self.profiler.mark('clear')
+        for group in self.sprite_groups:
+            self.renderer.draw_group(surface, group, self.previous_positions, alpha, offset)
+        if self.scene_surface:
+            pygame.transform.scale(self.scene_surface, (WINDOW_WIDTH, WINDOW_HEIGHT), display_surface)
+        self.profiler.mark('draw')
+        self.renderer.add_rects(self.game.draw())
+        if self.profiler.show_overlay:
+            self.renderer.add_rects([self.profiler.draw(display_surface)])
+        self.profiler.mark('hud')
+
+        #Update The display
+        self.renderer.update_display()
+        self.profiler.mark('display')
+
+    def get_pool_stats(self):
+        """Return the statistics of every sprite pool"""
+        return {
+            "bullet": self.bullet_pool.get_stats(),
+            "zombie": self.zombie_pool.get_stats(),
+            "ruby": self.ruby_pool.get_stats(),
+        }
+
+    def get_checksum(self):
+        """Return a checksum of the simulation state (equal checksums mean two runs played out the same)"""
+        state = [self.frame_count, self.game.score, self.game.round_number, self.game.round_time, self.player.health,
+                 tuple(self.player.position), tuple(self.player.velocity), self.random.getstate()]
+        for group in (self.bullet_group, self.zombie_group, self.ruby_group):
+            state.append([sprite.rect.topleft for sprite in group])
+        state.append(self.kinematics.position[self.kinematics.active].tobytes())
+        state.append(self.kinematics.velocity[self.kinematics.active].tobytes())
+
+        return zlib.crc32(repr(state).encode())
+
+    def run(self, frames, get_inputs=None):
+        """Step the game as fast as possible. get_inputs(engine) returns the inputs for each frame"""
+        for i in range(frames):
+            self.step(get_inputs(self) if get_inputs else 0)
 
 #Create a tile map 
 #0 -> No Tile, 1 -> Dirt, 2-5 -> Platforms, 6 -> Ruby Maker, 7-8 -> Portals, 9 -> Player
@@ -1201,94 +2856,257 @@ tile_map = [
     [1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1]
 ]
 
-#Generate tile objects from the tile map
-#Loop through the 23 lists (rows) in the tile map (i moves us down)
-for i in range(len(tile_map)):
-    #Loop through the 40 elements in a given list (cols) (j moves us across the map)
-    for j in range(len(tile_map[i])):
-        #Dirt tile
-        if tile_map[i][j] == 1:
-            Tile(j*32, i*32, 1, my_main_tile_group)
-        #Platform Tiles
-        elif tile_map[i][j] == 2:
-            Tile(j*32, i*32, 2, my_main_tile_group, my_platform_group)
-        elif tile_map[i][j] == 3:
-            Tile(j*32, i*32, 3, my_main_tile_group, my_platform_group)
-        elif tile_map[i][j] == 4:
-            Tile(j*32, i*32, 4, my_main_tile_group, my_platform_group)
-        elif tile_map[i][j] == 5:
-            Tile(j*32, i*32, 5, my_main_tile_group, my_platform_group)
-        #Ruby Maker
-        elif tile_map[i][j] == 6:
-            RubyMaker(j*32, i*32, my_main_tile_group)
-        #Portals
-        elif tile_map[i][j] == 7:
-            Portal(j*32, i*32, "green", my_portal_group)
-        elif tile_map[i][j] == 8:
-            Portal(j*32, i*32, "purple", my_portal_group)
+def repeat_map(level_map, across, down):
+    """Return a bigger night made of across x down copies of a tile map.
+    Only the first copy keeps the player, and only portals that end up near the corners of the night are kept (they lead to the corners)"""
+    rows = len(level_map)
+    columns = len(level_map[0])
+
+    def get_cell(i, j):
+        cell = level_map[i % rows][j % columns]
         #Player
-        elif tile_map[i][j] == 9:
-            my_player = Player(j*32 - 32, i*32 + 32, my_platform_group, my_portal_group, my_bullet_group)
-            my_player_group.add(my_player)
-
-#Load in a background image (must resize image)
-background_image = pygame.transform.scale(pygame.image.load(join('Assets', 'images', 'background.png')),(1280, 736))
-background_rect = background_image.get_rect()
-background_rect.topleft = (0, 0)
-
-#Create a game object
-my_game = Game(my_player, my_zombie_group, my_platform_group, my_portal_group, my_bullet_group, my_ruby_group)
-my_game.title_page("Zombie Knight", "Press ENTER to begin!")
-pygame.mixer.music.play(-1, 0.0, 2000)
-
-#Main Game Loop
-running = True
-while running:
-    #Check to see if the user wants to quit
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        if event.type == pygame.KEYDOWN:
-            #Player wants to jump
-            if event.key == pygame.K_SPACE:
-                my_player.jump()
-            #Player wants to fire
-            if event.key == pygame.K_UP:
-                my_player.fire()
-            #Player wants to pause game
-            if event.key == pygame.K_ESCAPE:
-                my_game.pause_game("TAKING A BREATHER", "Press ENTER to continue....")
-
-    #Blit background image to screen
-    display_surface.blit(background_image, background_rect)
-
-    #Draw tiles and Update Ruby maker
-    my_main_tile_group.update()
-    my_main_tile_group.draw(display_surface)
-
-    my_portal_group.update()
-    my_portal_group.draw(display_surface)
-
-    my_player_group.update()
-    my_player_group.draw(display_surface)
-
-    my_bullet_group.update()
-    my_bullet_group.draw(display_surface)
-
-    my_zombie_group.update()
-    my_zombie_group.draw(display_surface)
-
-    my_ruby_group.update()
-    my_ruby_group.draw(display_surface)
-
-    #Update and the game
-    my_game.update()
-    my_game.draw()
-
-    #Update The display and tick clock
-    pygame.display.update()
-    clock.tick(FPS)
-
-
-#End game loop
-pygame.quit()
\ No newline at end of file
+        if cell == 9 and (i >= rows or j >= columns):
+            return 0
+        #Portals
+        if cell in (7, 8):
+            near_side = j < columns / 2 or j >= columns * across - columns / 2
+            near_end = i < rows / 2 or i >= rows * down - rows / 2
+            if not (near_side and near_end):
+                return 0
+        return cell
+
+    return [[get_cell(i, j) for j in range(columns * across)] for i in range(rows * down)]
+
+def setup(headless=False, audio=True):
+    """Start pygame, create the display and load the shared assets. Headless uses SDL's dummy video driver"""
+    global display_surface, asset_loader, asset_cache, sound_bank
+
+    #Only set things up once per process
+    if display_surface is not None:
+        return
+
+    #Initialize Pygame (the display is still needed to convert images, so headless opens a dummy one)
+    if headless:
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    if audio:
+        pygame.init()
+    else:
+        pygame.display.init()
+        pygame.font.init()
+
+    #Set display surface
+    display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption("Zombie Knight")
+
+    #Image and sound files are decoded on worker threads while the title screen is up
+    asset_loader = AssetLoader(min(4, os.cpu_count() or 1))
+
+    #Create the asset cache shared by every sprite (use the baked atlas if bake_atlas.py has been run)
+    asset_cache = AssetCache(asset_loader)
+    if exists(join('Assets', 'atlas', 'atlas.json')):
+        asset_cache.load_atlas(join('Assets', 'atlas', 'atlas.json'), join('Assets', 'atlas', 'atlas.rgba'))
+
+    #Start decoding every image the atlas doesn't already hold
+    atlas_paths = {path for path, size in asset_cache.atlas_frames}
+    image_paths = sorted(glob(join('Assets', 'images', '**', '*.png'), recursive=True))
+    asset_loader.submit([path for path in image_paths if path not in atlas_paths], pygame.image.load)
+
+    #Create the sound bank and start decoding every sound effect once (name, path, volume, max voices, priority)
+    sound_bank = SoundBank(16, asset_loader, audio)
+    sound_bank.load('jump', join('Assets', 'sounds', 'jump_sound.wav'), .25, 2, 2)
+    sound_bank.load('slash', join('Assets', 'sounds', 'slash_sound.wav'), .25, 2, 2)
+    sound_bank.load('player_hit', join('Assets', 'sounds', 'player_hit.wav'), .25, 1, 3)
+    sound_bank.load('ruby_pickup', join('Assets', 'sounds', 'ruby_pickup.wav'), .15, 2, 3)
+    sound_bank.load('lost_ruby', join('Assets', 'sounds', 'lost_ruby.wav'), .15, 2, 2)
+    sound_bank.load('portal', join('Assets', 'sounds', 'portal_sound.wav'), .25, 2, 1)
+    sound_bank.load('zombie_hit', join('Assets', 'sounds', 'zombie_hit.wav'), .25, 3, 1)
+    sound_bank.load('zombie_kick', join('Assets', 'sounds', 'zombie_kick.wav'), .25, 3, 1)
+    sound_bank.load_music(join('Assets', 'sounds', 'level_music.wav'), .25)
+
+def get_argument(name):
+    """Return the command line value after name (like --seed 5) or None"""
+    if name in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(name) + 1]
+    return None
+
+def replay(path, render=False):
+    """Replay a recording as fast as possible and return the engine and whether it played out the same"""
+    setup(headless=not render, audio=False)
+
+    recording = InputReplay(path)
+    engine = Engine(tile_map, render, False, seed=recording.seed)
+    engine.run(len(recording.inputs), recording.get_inputs)
+
+    return engine, engine.get_checksum() == recording.checksum
+
+def create_engine():
+    """Build the engine for a game played in the window (from the command line options)"""
+    #Only redraw and update the parts of the screen that changed (run with --dirty-rects)
+    #Play a seeded game with --seed and save the session with --record
+    #Play a bigger night made of copies of the tile map with --map-size (like --map-size 3x2)
+    seed = get_argument('--seed')
+    map_size = get_argument('--map-size')
+    level_map = repeat_map(tile_map, *map(int, map_size.split('x'))) if map_size else tile_map
+    engine = Engine(level_map, True, True, '--dirty-rects' in sys.argv, seed=int(seed) if seed else None)
+    if get_argument('--record'):
+        engine.recorder = InputRecorder(engine.seed)
+
+    #Draw the world at a lower resolution whenever frames take longer than a simulation step (run with --adaptive-resolution)
+    if '--adaptive-resolution' in sys.argv:
+        engine.resolution_governor = ResolutionGovernor(RENDER_SCALES, STEP_TIME, FPS // 2)
+
+    #Slow down decorative and far away animation whenever frames take longer than a simulation step (run with --adaptive-detail)
+    if '--adaptive-detail' in sys.argv:
+        engine.quality_governor = FrameTimeGovernor(range(len(DETAIL_TIERS)), STEP_TIME, FPS // 2)
+
+    #Press F3 to show frame times and stream them to a file with --profile-csv
+    profile_path = get_argument('--profile-csv')
+    if profile_path:
+        engine.profiler.open_csv(profile_path)
+
+    #Everything made so far lives for the whole game, so keep the garbage collector from scanning it
+    gc.collect()
+    gc.freeze()
+    return engine
+
+def main():
+    """Play the game in a window"""
+    setup()
+
+    #Show the title screen straight away (it only needs the fonts, and the rest of the assets keep loading behind it)
+    title_font = pygame.font.Font(join('Assets', 'fonts', 'Poultrygeist.ttf'), 48)
+    text_font = pygame.font.Font(join('Assets', 'fonts', 'Pixel.ttf'), 24)
+    screen_renderer = ScreenRenderer(title_font, text_font, TextCache(16))
+    engine = None
+    clock = pygame.time.Clock()
+
+    #Main Game Loop. Scenes: title -> controls -> play, and play -> paused -> play
+    #Still scenes (title, controls and pause screens) are pre-rendered and sleep until there is an event
+    scene = 'title'
+    screen = screen_renderer.get_screen("Zombie Knight", "Press ENTER to begin!")
+    screen_shown = False
+    progress_shown = False
+
+    #Play uses fixed simulation steps, drawing as often as allowed
+    previous_time = time.perf_counter()
+    lag = 0
+    inputs = 0
+    running = True
+    while running:
+        if scene != 'play':
+            #Redraw the loading bar every so often while files are decoding (only the title screen has room for it),
+            #and once more without it when they are done
+            show_progress = scene == 'title' and asset_loader.is_loading()
+            if not screen_shown or show_progress or progress_shown:
+                display_surface.blit(screen, (0, 0))
+                if show_progress:
+                    screen_renderer.draw_progress(display_surface, asset_loader.get_progress())
+                pygame.display.update()
+                screen_shown = True
+                progress_shown = show_progress
+
+            #Build the engine while the controls are read. It only waits for the files it uses, and sounds and anything else keep streaming
+            if scene == 'controls' and engine is None:
+                engine = create_engine()
+
+            #Wake up to redraw the loading bar while it is shown
+            event = pygame.event.wait(LOADING_REFRESH) if show_progress else pygame.event.wait()
+            #User wants to quit
+            if event.type == pygame.QUIT:
+                running = False
+            #User wants to continue
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
+                screen_shown = False
+                if scene == 'title':
+                    scene = 'controls'
+                    screen = screen_renderer.get_controls_screen()
+                elif scene == 'paused' and engine.game.pending_screens:
+                    screen = engine.game.pending_screens.pop(0)
+                else:
+                    if scene == 'controls':
+                        sound_bank.play_music()
+                    else:
+                        engine.game.resume_game()
+                    scene = 'play'
+
+                    #Time spent on a still screen is not simulated
+                    previous_time = time.perf_counter()
+                    lag = 0
+                    inputs = 0
+            continue
+
+        engine.profiler.start_frame()
+        frame_start = time.perf_counter()
+
+        #Check to see if the user wants to quit
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.KEYDOWN:
+                #Show or hide the profiler
+                if event.key == pygame.K_F3:
+                    engine.profiler.toggle_overlay()
+                #Player wants to jump
+                if event.key == pygame.K_SPACE:
+                    inputs |= INPUT_JUMP
+                #Player wants to fire
+                if event.key == pygame.K_UP:
+                    inputs |= INPUT_SLASH
+                #Player wants to pause game
+                if event.key == pygame.K_ESCAPE:
+                    inputs |= INPUT_PAUSE
+
+        #Player is holding a direction key
+        inputs &= ~(INPUT_LEFT | INPUT_RIGHT)
+        keys = pygame.key.get_pressed()
+        if keys[pygame.K_LEFT]:
+            inputs |= INPUT_LEFT
+        if keys[pygame.K_RIGHT]:
+            inputs |= INPUT_RIGHT
+
+        #Run every simulation step that is due, drawing at least every MAX_FRAME_SKIP steps
+        current_time = time.perf_counter()
+        lag += current_time - previous_time
+        previous_time = current_time
+        steps = 0
+        while lag >= STEP_TIME and steps < MAX_FRAME_SKIP:
+            engine.update(inputs)
+            lag -= STEP_TIME
+            steps += 1
+            #Key presses only happen on one step
+            inputs &= INPUT_LEFT | INPUT_RIGHT
+
+            #The game was paused (or a night ended) during the step
+            if engine.game.pending_screens:
+                scene = 'paused'
+                screen = engine.game.pending_screens.pop(0)
+                break
+
+        if scene == 'play':
+            engine.draw(min(lag / STEP_TIME, 1))
+            engine.adapt_to_frame_time(time.perf_counter() - frame_start)
+
+            #Tick clock
+            clock.tick(MAX_RENDER_FPS)
+            engine.profiler.mark('idle')
+            engine.profiler.end_frame()
+
+    #End game loop (the window may be closed before the engine was built or while files are still decoding)
+    if engine:
+        if engine.recorder:
+            engine.recorder.save(get_argument('--record'), engine.get_checksum())
+        engine.profiler.close_csv()
+    asset_loader.shutdown()
+    pygame.quit()
+
+if __name__ == "__main__":
+    #Replay a recorded session without a window: python Code/zombie_knight.py --replay session.json
+    replay_path = get_argument('--replay')
+    if replay_path:
+        start_time = time.perf_counter()
+        engine, matched = replay(replay_path)
+        print(f"Replayed {engine.frame_count} frames in {time.perf_counter() - start_time:.2f}s, "
+              f"score {engine.game.score}, night {engine.game.round_number}, "
+              f"{'state matches the recording' if matched else 'STATE DOES NOT MATCH THE RECORDING'}")
+    else:
+        main()
@@ -0,0 +1,44 @@
+import os, sys, time
+from os.path import abspath, dirname, join
+
+#Run from the project folder: python -m pytest tests
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT, 'Code'))
+os.chdir(ROOT)
+import zombie_knight
+
+def test_toggle_overlay_mid_frame():
+    """Turning the profiler on part way through a frame never records time from before it was on"""
+    zombie_knight.setup(headless=True, audio=False)
+    profiler = zombie_knight.FrameProfiler(240)
+
+    #The main loop starts the frame before it handles F3, so the first frame starts while the profiler is off
+    for i in range(3):
+        profiler.start_frame()
+        if i == 0:
+            time.sleep(.05)
+            profiler.toggle_overlay()
+        for phase in zombie_knight.PROFILE_PHASES:
+            profiler.mark(phase)
+        profiler.end_frame()
+
+    assert profiler.frame_count == 3
+    for phase, average in profiler.get_averages().items():
+        assert average < 1000 / zombie_knight.FPS, phase
+
+def test_csv_rows_written_before_close(tmp_path):
+    """Every frame is in the CSV file straight away, so a crash doesn't lose the capture"""
+    zombie_knight.setup(headless=True, audio=False)
+    profiler = zombie_knight.FrameProfiler(240)
+    path = tmp_path / "profile.csv"
+    profiler.open_csv(path)
+
+    for i in range(3):
+        profiler.start_frame()
+        for phase in zombie_knight.PROFILE_PHASES:
+            profiler.mark(phase)
+        profiler.end_frame()
+
+    #Header and one row per frame, read before the file is closed
+    assert len(path.read_text().splitlines()) == 4
+    profiler.close_csv()